@@ -8,6 +8,9 @@ Supported parser: argparse.
 # IMPORT #
 ##########
 import argparse
+from types import MappingProxyType
+
+from .model import ArgumentSpec, SubparserSpec, index_by_name
 
 #########
 # CLASS #
@@ -16,12 +19,18 @@ class ExtractedParser:
     """
     Contain arguments and subparser list.
     The constructor called depended on the parser used.
+
+    Once built, the model is made of immutable objects:
+        - arguments: tuple of ArgumentSpec of the parser
+        - list_subparsers: tuple of SubparserSpec, in the parser order
+        - subparsers: mapping from subcommand name to SubparserSpec
+        - by_name: mapping from dest to ArgumentSpec of the parser
     """
 
     def __init__(self, parser):
         self.parser = parser
-        self.arguments = []
-        self.list_subparsers = []
+        self.arguments = ()
+        self.list_subparsers = ()
         if isinstance(parser, argparse.ArgumentParser):
             self._argparse_extractor_(parser)
         else:
@@ -32,66 +41,75 @@ class ExtractedParser:
         Constructor used by the ExtractedParser object if the used parser
         is argparse.
         """
-        # We don't want help actions for now
-        parser._actions = [
-            x for x in parser._actions if not isinstance(x, argparse._HelpAction)
-        ]
-
-        for action in parser._actions:
+        arguments, list_subparsers = [], []
+        for action in _argparse_actions(parser):
             if isinstance(action, argparse._SubParsersAction):
-                for parser_name in action.choices:
-                    list_actions = [
-                        i
-                        for i in action.choices[parser_name]._actions
-                        if not isinstance(i, argparse._HelpAction)
-                    ]
-                    subparser = {}
-                    subparser["name"] = parser_name
-                    subparser["list_actions"] = []
-                    for option in list_actions:
-                        subparser["list_actions"].append(
-                            self._argparse_action_normalizer(option)
-                        )
-                    self.list_subparsers.append(subparser)
+                for parser_name, subparser in action.choices.items():
+                    list_subparsers.append((parser_name, subparser))
             else:
-                self.arguments.append(self._argparse_action_normalizer(action))
+                arguments.append(self._argparse_action_normalizer(action))
+        self.arguments = tuple(arguments)
+        self.by_name = index_by_name(self.arguments)
+        self.list_subparsers = tuple(
+            SubparserSpec(
+                parser_name,
+                map(self._argparse_action_normalizer, _argparse_actions(subparser)),
+                self.arguments,
+            )
+            for parser_name, subparser in list_subparsers
+        )
+        self.subparsers = MappingProxyType(
+            {subparser.name: subparser for subparser in self.list_subparsers}
+        )
 
     def _argparse_action_normalizer(self, action):
         """
         Return representation of given argparse action in the model.
         """
-        arg = {}
-        if action.option_strings != []:
-            arg["cli"] = action.option_strings[0]
-        else:
-            arg["cli"] = action.option_strings
-        arg["name"] = action.dest
-        arg["choices"] = action.choices
-        arg["help"] = action.help
-        arg["default"] = action.default
-        if "path" in action.help.lower() and "file" in action.help.lower():
-            arg["type"] = "file_path"
-        elif "path" in action.help.lower() and "directory" in action.help.lower():
-            arg["type"] = "directory_path"
-        elif action.type is not None:
-            arg["type"] = action.type
-        elif isinstance(action, argparse._StoreAction):
-            arg["type"] = str
-        elif isinstance(
-            action,
-            (
-                argparse._StoreTrueAction,
-                argparse._StoreConstAction,
-                argparse._StoreFalseAction,
-            ),
-        ):
-            arg["type"] = bool
-        elif isinstance(action, argparse._AppendAction):
-            arg["type"] = "append_action"
-        elif isinstance(action, argparse._CountAction):
-            arg["type"] = "count_action"
-        elif isinstance(action, argparse._VersionAction):
-            arg["type"] = "version_action"
-        else:
-            raise TypeError("Unsupported argument type: ", type(action))
-        return arg
+        return ArgumentSpec(  # positional arguments are faster to bind
+            action.option_strings[0] if action.option_strings else [],
+            action.dest,
+            action.choices,
+            action.help,
+            action.default,
+            _argparse_type(action),
+        )
+
+
+#############
+# FUNCTIONS #
+#############
+def _argparse_actions(parser) -> list:
+    "Return the actions of given parser, except help ones"
+    # We don't want help actions for now
+    return [x for x in parser._actions if not isinstance(x, argparse._HelpAction)]
+
+
+def _argparse_type(action) -> object:
+    "Return the type of given action in the model"
+    help_text = (action.help or "").lower()
+    if "path" in help_text and "file" in help_text:
+        return "file_path"
+    elif "path" in help_text and "directory" in help_text:
+        return "directory_path"
+    elif action.type is not None:
+        return action.type
+    elif isinstance(action, argparse._StoreAction):
+        return str
+    elif isinstance(
+        action,
+        (
+            argparse._StoreTrueAction,
+            argparse._StoreConstAction,
+            argparse._StoreFalseAction,
+        ),
+    ):
+        return bool
+    elif isinstance(action, argparse._AppendAction):
+        return "append_action"
+    elif isinstance(action, argparse._CountAction):
+        return "count_action"
+    elif isinstance(action, argparse._VersionAction):
+        return "version_action"
+    else:
+        raise TypeError("Unsupported argument type: ", type(action))
@@ -0,0 +1,171 @@
+"""Display of numpy arrays as images.
+
+Arrays of shape (height, width) are shown as grayscale images, or through
+a colormap ; arrays of shape (height, width, 3 or 4) as RGB or RGBA images.
+Arrays of other types than uint8 are scaled to [0;255], NaN values being
+shown with a specific color.
+
+All operations are vectorized: no python loop over the pixels.
+
+"""
+
+import functools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# maximal number of values used to estimate the percentiles of an array
+PERCENTILE_SAMPLES = 2 ** 20
+# number of values converted at once, small enough to stay in the CPU cache
+CHUNK_SIZE = 2 ** 18
+
+
+def is_array(obj: object) -> bool:
+    "True if given object is a numpy array that can be shown as an image"
+    return (
+        numpy is not None
+        and isinstance(obj, numpy.ndarray)
+        and (obj.ndim == 2 or (obj.ndim == 3 and obj.shape[2] in {1, 3, 4}))
+    )
+
+
+def to_pixels(
+    array,
+    scaling: str = "minmax",
+    percentiles: (float, float) = (1, 99),
+    colormap: str or object = None,
+    nan_color: tuple = (0, 0, 0, 0),
+):
+    """Return the C-contiguous array of uint8 pixels showing given array
+
+    scaling -- how to map values of other types than uint8 to [0;255]:
+        "minmax" maps the minimal value to 0 and the maximal one to 255,
+        "percentile" does the same with given percentiles, clipping the outliers
+    percentiles -- the low and high percentiles used by the "percentile" scaling
+    colormap -- for 2-D arrays, None for grayscale, or a name of colormap_lut
+        or a lookup table of 256 RGB(A) colors
+    nan_color -- the RGBA color of the NaN values
+
+    """
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    mask = None  # NaN values
+    if array.dtype == numpy.uint8:
+        pixels = array
+    elif array.dtype == numpy.bool_:
+        pixels = array.view(numpy.uint8) * numpy.uint8(255)
+    else:
+        pixels, mask = _scaled(array, scaling, percentiles)
+    if pixels.ndim == 2 and mask is not None and colormap is None:
+        colormap = "gray"  # NaN color needs RGBA pixels
+    if pixels.ndim == 2 and colormap is not None:
+        # with the colors packed in uint32, the lookup is a single gather
+        packed = colormap_lut(colormap).view(numpy.uint32)[:, 0].take(pixels)
+        if mask is not None:
+            packed[mask] = _packed_color(nan_color)
+        return packed.view(numpy.uint8).reshape(pixels.shape + (4,))
+    if mask is not None:
+        if pixels.shape[2] == 3:
+            alpha = numpy.full(pixels.shape[:2] + (1,), 255, numpy.uint8)
+            pixels = numpy.concatenate((pixels, alpha), axis=2)
+        if mask.ndim == 3:  # NaN in any channel
+            mask = mask.any(axis=2)
+        pixels[mask] = nan_color
+    return numpy.ascontiguousarray(pixels)
+
+
+def _scaled(array, scaling: str, percentiles: (float, float)):
+    "Return given array scaled to uint8, and the mask of its NaN values or None"
+    floating = array.dtype.kind == "f"
+    if not array.size:
+        return numpy.zeros(array.shape, numpy.uint8), None
+    if scaling == "minmax":
+        low, high = array.min(), array.max()
+        has_nan = floating and bool(numpy.isnan(low) or numpy.isnan(high))
+        if has_nan:  # fmin and fmax ignore NaN
+            low = numpy.fmin.reduce(array, axis=None)
+            high = numpy.fmax.reduce(array, axis=None)
+        if floating and not (numpy.isfinite(low) and numpy.isfinite(high)):
+            values = array[numpy.isfinite(array)]
+            low, high = (values.min(), values.max()) if values.size else (0, 0)
+    elif scaling == "percentile":
+        has_nan = floating and bool(numpy.isnan(array.min()))  # NaN is propagated
+        sample = array.reshape(-1)[:: max(1, array.size // PERCENTILE_SAMPLES)]
+        if floating:
+            sample = sample[numpy.isfinite(sample)]
+        low, high = numpy.percentile(sample, percentiles) if sample.size else (0, 0)
+    else:
+        raise ValueError("Unknown scaling: {}".format(repr(scaling)))
+    factor = 255 / (float(high) - float(low)) if high > low else 0.0
+    clip = scaling != "minmax" or floating  # values may be out of [0;255]
+    # Convert by chunks of rows, so that the temporary values stay in cache ;
+    #  float32 is precise enough for display, and halves the memory traffic.
+    pixels = numpy.empty(array.shape, numpy.uint8)
+    rows = max(1, CHUNK_SIZE // max(1, array[0].size))
+    buffer = numpy.empty((rows,) + array.shape[1:], numpy.float32)
+    with numpy.errstate(invalid="ignore"):  # NaN pixels are overwritten later
+        for start in range(0, len(array), rows):
+            chunk = array[start : start + rows]
+            scaled = buffer[: len(chunk)]
+            numpy.subtract(chunk, low, out=scaled, dtype=numpy.float32)
+            scaled *= factor
+            if clip:
+                numpy.clip(scaled, 0, 255, out=scaled)
+            pixels[start : start + rows] = scaled
+    return pixels, numpy.isnan(array) if has_nan else None
+
+
+@functools.lru_cache(maxsize=None)
+def _named_colormap(name: str):
+    x = numpy.linspace(0, 1, 256)
+    if name == "gray":
+        channels = x, x, x
+    elif name == "hot":
+        channels = 3 * x, 3 * x - 1, 3 * x - 2
+    elif name == "jet":
+        channels = tuple(1.5 - numpy.abs(4 * x - shift) for shift in (3, 2, 1))
+    else:
+        try:
+            from matplotlib import colormaps
+        except ImportError:
+            raise ValueError(
+                "Unknown colormap {} ; install matplotlib to use it".format(repr(name))
+            )
+        try:
+            return colormap_lut(_as_lut(colormaps[name](x)))
+        except KeyError:
+            raise ValueError("Unknown colormap: {}".format(repr(name)))
+    return colormap_lut(_as_lut(numpy.stack(channels, axis=1)))
+
+
+def _as_lut(colors) -> object:
+    "Return given colors (components in [0;1]) as a lookup table of uint8"
+    return numpy.round(numpy.clip(colors, 0, 1) * 255).astype(numpy.uint8)
+
+
+def _packed_color(color: tuple):
+    "Return given RGBA color, as an uint32 with the layout of the RGBA pixels"
+    return numpy.array(color, numpy.uint8).view(numpy.uint32)[0]
+
+
+def colormap_lut(colormap: str or object):
+    """Return the lookup table of given colormap, as a (256, 4) array of uint8
+
+    colormap -- the name of a colormap ("gray", "hot", "jet", or any matplotlib
+        colormap if installed), or its lookup table of 256 RGB(A) colors,
+        given as uint8 or as floats in [0;1]
+
+    """
+    if isinstance(colormap, str):
+        return _named_colormap(colormap)
+    lut = numpy.asarray(colormap)
+    if lut.shape not in {(256, 3), (256, 4)}:
+        raise ValueError("A colormap must have 256 RGB or RGBA colors")
+    if lut.dtype != numpy.uint8:
+        lut = _as_lut(lut)
+    if lut.shape[1] == 3:  # opaque colors
+        lut = numpy.concatenate((lut, numpy.full((256, 1), 255, numpy.uint8)), axis=1)
+    return numpy.ascontiguousarray(lut)
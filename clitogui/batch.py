@@ -0,0 +1,282 @@
+"""Replay of recorded sessions without GUI.
+
+Run the callback of a decorated parser over command-line arguments recorded
+by the GUI (see the record parameter of the interfaces), one per JSONL line:
+
+    python -m clitogui.batch my_program:cli session.jsonl --output results/
+
+my_program:cli is the decorated function returning the parser, given as
+a module name or a file path ; its module must not parse the arguments
+when imported. The jobs run in a pool of worker processes, and their
+outputs are written in the output directory as soon as computed:
+PIL images as PNG, numpy arrays as .npy, strings as .txt, anything else
+pickled. The outcome and duration of each job is written
+to results.jsonl in the output directory. The results and outputs of a
+previous batch in the same directory are removed first.
+
+No QApplication is created, and Qt is not even imported, unless
+the callback expects args._run.
+
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import inspect
+import argparse
+import importlib
+import importlib.util
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+
+def load_target(target: str) -> callable:
+    "Return the object described by given 'module:name' or 'path.py:name'"
+    module_name, _, name = target.rpartition(":")
+    if not module_name or not name:
+        raise ValueError("Expected module:name, got {}".format(repr(target)))
+    if module_name.endswith(".py") or os.sep in module_name:
+        path = os.path.abspath(module_name)
+        module_name = "_clitogui_batch_" + os.path.splitext(os.path.basename(path))[0]
+        module = sys.modules.get(module_name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module  # so that its functions are picklable
+            spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, name)
+
+
+def load_job(target: str, callback: str = None) -> (object, callable, dict):
+    """Return the parser, the callback and the options of the interactive GUI
+    of given decorated function, or of given callback if any"""
+    decorated = load_target(target)
+    parser = decorated()
+    gui_args = getattr(decorated, "gui_args", ())
+    gui_kwargs = dict(getattr(decorated, "gui_kwargs", {}))
+    if callback is not None:
+        function = load_target(callback)
+    elif gui_args or "callback" in gui_kwargs:
+        function = gui_kwargs.pop("callback", None) or gui_args[0]
+    else:
+        raise ValueError("{} has no callback ; give one with --callback".format(target))
+    return parser, function, gui_kwargs
+
+
+def read_records(path: str) -> iter:
+    """Yield the command-line arguments of each line of given JSONL file
+
+    A line is either a record written by the GUI, or a JSON list of arguments.
+
+    """
+    with open(path) as fd:
+        for line in fd:
+            if line.strip():
+                record = json.loads(line)
+                yield record["args"] if isinstance(record, dict) else record
+
+
+_jobs = {}  # (target, callback) -> loaded job, in each worker process
+
+
+def run_job(target: str, callback: str, index: int, argv: list, output: str) -> dict:
+    """Executed in a worker process: run the callback over given arguments,
+    and write its output in the output directory ; return the outcome"""
+    start = time.perf_counter()
+    result = {"job": index, "args": argv}
+    try:
+        if (target, callback) not in _jobs:
+            _jobs[target, callback] = load_job(target, callback)
+        parser, function, options = _jobs[target, callback]
+        try:
+            parsed = parser.old_parse_args(argv)
+        except SystemExit:  # argparse already printed the error
+            raise ValueError("Invalid arguments: {}".format(argv))
+        if options.get("preview"):
+            parsed._preview = None  # full quality
+        if options.get("progress"):
+            from .runner import RunContext
+
+            parsed._run = RunContext()
+        value = function(parsed)
+        if inspect.isgenerator(value):
+            value = tuple(value)
+        result["seconds"] = time.perf_counter() - start
+        result["files"] = write_output(
+            value, os.path.join(output, "job-{:05d}".format(index))
+        )
+        result["status"] = "ok"
+    except Exception as err:
+        result["seconds"] = time.perf_counter() - start
+        result["status"] = "failed"
+        result["error"] = "".join(traceback.format_exception_only(type(err), err))
+        result["traceback"] = traceback.format_exc()
+    return result
+
+
+def write_output(value: object, prefix: str) -> [str]:
+    "Write given callback output in files starting by prefix, return their paths"
+    if _split(value):
+        paths = []
+        for index, elem in enumerate(value):
+            paths += write_output(elem, "{}-{}".format(prefix, index))
+        return paths
+    path = prefix + (_extension(value) or ".pickle")
+    if path.endswith(".png"):
+        value.save(path)
+    elif path.endswith(".npy"):
+        import numpy
+
+        numpy.save(path, value)
+    elif path.endswith(".txt"):
+        with open(path, "w") as fd:
+            fd.write(value)
+    else:
+        with open(path, "wb") as fd:
+            pickle.dump(value, fd, protocol=pickle.HIGHEST_PROTOCOL)
+    return [path]
+
+
+def _extension(value: object) -> str or None:
+    "Return the extension of the file of given value, if not to be pickled"
+    module = type(value).__module__
+    if module.startswith("PIL.") and hasattr(value, "save"):
+        return ".png"
+    elif module == "numpy" and hasattr(value, "dtype"):
+        return ".npy"
+    elif isinstance(value, str):
+        return ".txt"
+    return None
+
+
+def _split(value: object) -> bool:
+    "True if given value is a list or tuple of values to write in their own files"
+    return isinstance(value, (tuple, list)) and any(
+        _extension(elem) or _split(elem) for elem in value[:100]
+    )
+
+
+def run_batch(
+    target: str,
+    records: str,
+    output: str,
+    workers: int = None,
+    in_flight: int = None,
+    callback: str = None,
+    log=sys.stdout,
+) -> [dict]:
+    """Run the callback over each recorded arguments, return the failed jobs
+
+    At most in_flight jobs (by default twice the number of workers) are
+    submitted at once, so that the records are read as the jobs are done.
+
+    """
+    load_job(target, callback)  # fail early if anything is missing
+    os.makedirs(output, exist_ok=True)
+    remove_outputs(output)
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or 2 * workers
+    failures, nb_jobs = [], 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(
+        os.path.join(output, "results.jsonl"), "w"
+    ) as results:
+        pending = {}  # future -> (index, arguments) of the submitted jobs
+        for index, argv in enumerate(read_records(records)):
+            if len(pending) >= in_flight:
+                failures += _report(pending, results, log)
+            future = executor.submit(run_job, target, callback, index, argv, output)
+            pending[future] = index, argv
+            nb_jobs += 1
+        while pending:
+            failures += _report(pending, results, log)
+    duration = time.perf_counter() - start
+    print(
+        "{} jobs in {:.1f} s ({:.2f} jobs/s), {} failed".format(
+            nb_jobs, duration, nb_jobs / duration if duration else 0, len(failures)
+        ),
+        file=log,
+    )
+    for failure in sorted(failures, key=lambda failure: failure["job"]):
+        print(
+            "  job {}: {} {}".format(
+                failure["job"], " ".join(failure["args"]), failure["error"].strip()
+            ),
+            file=log,
+        )
+    return failures
+
+
+_OUTPUT_FILE = re.compile(r"job-\d{5,}[-.]")  # files written by write_output
+
+
+def remove_outputs(output: str):
+    "Remove the job outputs of a previous batch from given directory"
+    for entry in os.scandir(output):
+        if entry.is_file() and _OUTPUT_FILE.match(entry.name):
+            os.remove(entry.path)
+
+
+def _report(pending: dict, results, log) -> [dict]:
+    """Wait for some of given jobs to finish, and write their outcome ;
+    return the failed ones"""
+    failures = []
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        index, argv = pending.pop(future)
+        try:
+            result = future.result()
+        except Exception as err:  # worker crashed
+            result = {"job": index, "args": argv, "seconds": 0.0, "status": "failed"}
+            result["error"] = "".join(traceback.format_exception_only(type(err), err))
+        results.write(json.dumps(result) + "\n")
+        results.flush()
+        print(
+            "job {}: {} in {:.3f} s".format(
+                result["job"], result["status"], result["seconds"]
+            ),
+            file=log,
+        )
+        if result["status"] != "ok":
+            failures.append(result)
+    return failures
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m clitogui.batch",
+        description="Run the callback of a clitogui parser over recorded arguments",
+    )
+    parser.add_argument(
+        "target", help="the decorated function returning the parser, as module:name"
+    )
+    parser.add_argument("records", help="JSONL file of the recorded arguments")
+    parser.add_argument(
+        "--output", "-o", default="batch-results", help="where to write the outputs"
+    )
+    parser.add_argument("--workers", "-w", type=int, help="number of worker processes")
+    parser.add_argument(
+        "--in-flight", type=int, help="maximal number of jobs submitted at once"
+    )
+    parser.add_argument(
+        "--callback", help="the callback to run, as module:name, if not decorated"
+    )
+    args = parser.parse_args(argv)
+    failures = run_batch(
+        args.target,
+        args.records,
+        args.output,
+        args.workers,
+        args.in_flight,
+        args.callback,
+    )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
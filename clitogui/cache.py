@@ -0,0 +1,266 @@
+"""Memoization of the interactive callbacks outputs.
+
+Outputs are kept in a least-recently-used cache, bounded both by
+its number of entries and by the (estimated) memory used by the outputs.
+
+They can also be kept on disk, to be reused across sessions.
+
+"""
+
+import os
+import sys
+import mmap
+import uuid
+import pickle
+import shutil
+import marshal
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# bytes per band for the image modes not using one byte per band
+IMAGE_MODE_BAND_SIZE = {"I": 4, "F": 4, "I;16": 2, "I;16B": 2, "I;16L": 2}
+
+
+def sizeof_output(obj: object) -> int:
+    "Return the estimated number of bytes used by given callback output"
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        return sys.getsizeof(obj) + sum(map(sizeof_output, obj))
+    elif isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            sizeof_output(key) + sizeof_output(value) for key, value in obj.items()
+        )
+    elif Image and isinstance(obj, Image.Image):
+        band_size = IMAGE_MODE_BAND_SIZE.get(obj.mode, 1)
+        return obj.width * obj.height * len(obj.getbands()) * band_size
+    elif hasattr(obj, "nbytes"):  # buffers, such as numpy arrays
+        return int(obj.nbytes)
+    else:
+        return sys.getsizeof(obj)
+
+
+class ResultCache:
+    """Thread-safe LRU mapping of keys to callback outputs.
+
+    max_entries -- maximal number of outputs kept ; 0 disables the cache
+    max_bytes -- maximal memory used by the kept outputs, or None for no limit
+
+    An output bigger than max_bytes is never kept.
+    Hits and misses of the get method are counted in the hits and misses attributes.
+
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = None):
+        self.max_entries, self.max_bytes = int(max_entries), max_bytes
+        self.hits, self.misses = 0, 0
+        self.nbytes = 0  # memory used by the kept outputs
+        self._entries = OrderedDict()  # key -> (output, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        "Return the output associated with key, or default"
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, output: object):
+        "Keep given output, evicting the least recently used ones if necessary"
+        if self.max_entries <= 0:
+            return
+        size = sizeof_output(output)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = output, size
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            ):
+                self.nbytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+def default_cache_directory() -> str:
+    "Return the directory where the disk cache is stored by default"
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(root, "clitogui")
+
+
+def callback_fingerprint(callback: callable) -> str or None:
+    """Return a hash of the code of given callback, or None if it can't be found
+
+    The hash changes whenever the callback is edited, or when python is updated.
+
+    """
+    code = getattr(callback, "__code__", None)
+    if code is None:  # maybe an object implementing __call__
+        code = getattr(getattr(callback, "__call__", None), "__code__", None)
+    if code is None:
+        return None
+    return hashlib.sha256(marshal.dumps(code)).hexdigest()
+
+
+class DiskCache:
+    """Content-addressed cache of callback outputs, stored in a directory.
+
+    directory -- where to store the outputs ; defaults to ~/.cache/clitogui
+    max_bytes -- maximal disk usage ; least recently used outputs are removed beyond it
+
+    Each output is stored in its own subdirectory, named after its key.
+    Outputs are pickled, except for the PIL images which are stored as raw
+    pixel data, memory-mapped when loaded back. Images of the modes Pillow maps
+    directly (L, P, RGBA, RGBX, CMYK, I;16) share the mapped memory ; the others,
+    such as RGB, are copied once when loaded.
+
+    """
+
+    VERSION = 1  # to increment whenever the storage format changes
+
+    def __init__(self, directory: str = None, max_bytes: int = 2 ** 30):
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, callback: callable, out_args: list, paths: iter = ()) -> str or None:
+        """Return the key identifying the output of callback for given out_args
+
+        paths -- files and directories used by the callback ; their modification
+            times are part of the key, so that they can be modified between runs
+        Return None if the callback can't be cached on disk.
+
+        """
+        fingerprint = callback_fingerprint(callback)
+        if fingerprint is None:
+            return None
+        mtimes = []
+        for path in paths:
+            try:
+                mtimes.append((path, os.stat(path).st_mtime_ns))
+            except (OSError, TypeError, ValueError):
+                mtimes.append((path, None))
+        description = repr((self.VERSION, fingerprint, tuple(out_args), mtimes))
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, key: str, default=None):
+        "Return the output associated with key, or default"
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, "output.pickle"), "rb") as fd:
+                output = _Unpickler(fd, entry).load()
+        except FileNotFoundError:
+            return default
+        except Exception:  # corrupted entry, probably an interrupted write
+            shutil.rmtree(entry, ignore_errors=True)
+            return default
+        try:  # mark it as recently used
+            os.utime(os.path.join(entry, "output.pickle"))
+        except OSError:
+            pass
+        return output
+
+    def put(self, key: str, output: object):
+        "Store given output, evicting the least recently used ones if necessary"
+        entry = os.path.join(self.directory, key)
+        tmp_entry = entry + ".tmp-" + uuid.uuid4().hex
+        os.makedirs(tmp_entry)
+        try:
+            with open(os.path.join(tmp_entry, "output.pickle"), "wb") as fd:
+                _Pickler(fd, tmp_entry).dump(output)
+            os.rename(tmp_entry, entry)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # unpicklable output, or already written by another run
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        "Remove the least recently used outputs until disk usage is below max_bytes"
+        if self.max_bytes is None:
+            return
+        entries, total = [], 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir() or ".tmp-" in entry.name:
+                continue
+            try:
+                files = tuple(os.scandir(entry.path))
+                size = sum(file.stat().st_size for file in files)
+                last_use = os.stat(os.path.join(entry.path, "output.pickle")).st_mtime
+            except OSError:  # being removed
+                continue
+            entries.append((last_use, size, entry.path))
+            total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+
+class _Pickler(pickle.Pickler):
+    "Pickler storing PIL images as raw files in given directory"
+
+    def __init__(self, file, directory: str):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.directory, self.nb_images = directory, 0
+
+    def persistent_id(self, obj):
+        if not (Image and isinstance(obj, Image.Image)):
+            return None  # pickle it as usual
+        filename = "{}.raw".format(self.nb_images)
+        self.nb_images += 1
+        with open(os.path.join(self.directory, filename), "wb") as fd:
+            fd.write(obj.tobytes())
+        palette = obj.getpalette() if obj.mode == "P" else None
+        return "image", filename, obj.mode, obj.size, palette
+
+
+class _Unpickler(pickle.Unpickler):
+    "Unpickler memory-mapping the raw images stored by _Pickler"
+
+    def __init__(self, file, directory: str):
+        super().__init__(file)
+        self.directory = directory
+
+    def persistent_load(self, pid):
+        kind, filename, mode, size, palette = pid
+        if kind != "image" or Image is None:
+            raise pickle.UnpicklingError("Unsupported persistent object: " + kind)
+        with open(os.path.join(self.directory, filename), "rb") as fd:
+            if os.fstat(fd.fileno()).st_size:
+                data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            else:  # empty image ; empty files can't be mapped
+                data = b""
+        # the image shares the mapped memory only for modes Pillow maps directly,
+        # it is decoded to a copy for the others (RGB included)
+        image = Image.frombuffer(mode, size, data, "raw", mode, 0, 1)
+        if data:  # raw pixels, to be shown without copy
+            image._raw_buffer = data
+        if palette is not None:
+            image.putpalette(palette)
+        return image
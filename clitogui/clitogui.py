@@ -5,16 +5,26 @@ The new parsing command allow to automaticly generate au GUI and return
 argument in a CLI form.
 """
 
+import importlib
 from functools import wraps
 from argparse import ArgumentParser
 
-from .argument_extractor import ExtractedParser
-from .gui import Interface
-from .interactive_gui import InteractiveInterface
+# GUI modules are imported only when a GUI is shown, so that programs
+#  run with explicit arguments don't pay for the import of Qt.
+
+
+def load_gui_object(gui_object: type or str) -> type:
+    """Return given GUI class, importing it first if given as "module:Class",
+    the module being relative to the clitogui package"""
+    if isinstance(gui_object, str):
+        module, name = gui_object.split(":")
+        gui_object = getattr(importlib.import_module("." + module, __package__), name)
+    return gui_object
 
 
 def make_clitogui(gui_object, *args, **kwargs):
-    """Build the decorator with given GUI object and its arguments"""
+    """Build the decorator with given GUI object (or its "module:Class" name)
+    and its arguments"""
 
     def clitogui(parser_function):
         """Decorator for a function returning a parser (such as argparse.ArgumentParser).
@@ -33,8 +43,15 @@ def make_clitogui(gui_object, *args, **kwargs):
                 """Generate the GUI, and send the returned CLI to the parser"""
                 if parser_args or parser_kwargs:
                     return parser.old_parse_args(*parser_args, **parser_kwargs)
+                from . import profiling
+                from .argument_extractor import ExtractedParser
+
+                with profiling.phase("extract_parser"):
+                    extracted_parser = ExtractedParser(parser)
                 # Use of Interface object from gui.py
-                gui = gui_object.build_and_run(ExtractedParser(parser), *args, **kwargs)
+                gui = load_gui_object(gui_object).build_and_run(
+                    extracted_parser, *args, **kwargs
+                )
                 return gui.parsed_args()
                 # return ret
 
@@ -52,15 +69,23 @@ def make_clitogui(gui_object, *args, **kwargs):
                 raise TypeError("Not supported parser: " + repr(parser_func))
             return parser
 
+        # kept for clitogui.batch, running the callback without any GUI
+        decorated_function.gui_object = gui_object
+        decorated_function.gui_args, decorated_function.gui_kwargs = args, kwargs
         return decorated_function
 
     return clitogui
 
 
-@wraps(InteractiveInterface)
 def make_interactive(*args, **kwargs):
-    return make_clitogui(InteractiveInterface, *args, **kwargs)
+    """Build the decorator showing an interactive GUI
+
+    Arguments are those of InteractiveInterface, except the ExtractedParser:
+    the callback, then the keyword-only options (tabulate, autorun,…).
+
+    """
+    return make_clitogui("interactive_gui:InteractiveInterface", *args, **kwargs)
 
 
-clitogui = on = make_clitogui(Interface)
+clitogui = on = make_clitogui("gui:Interface")
 interactive = interactively_on = make_interactive
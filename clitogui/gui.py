@@ -7,11 +7,16 @@ File containing the GUI stuff:
 """
 
 import io
+import os
 import sys
+import json
+import time
 import inspect
 import argparse
 import contextlib
 
+from .profiling import Profiler
+
 
 try:
     from PySide2.QtWidgets import *
@@ -21,6 +26,9 @@ except ImportError:
     from PyQt5.QtCore import *
 
 
+RECORD_ENV = "CLITOGUI_RECORD"
+
+
 class Interface(QDialog):
     """Automatized GUI using ExtractedParser object
 
@@ -38,26 +46,43 @@ class Interface(QDialog):
         - parsed_args: to modify the returned parsed_args object
         - _on_widget_creation: to modify option widgets after their creation
 
+    The duration of each phase (building, parsing of the GUI, parsing of the
+    arguments…) is measured by the profiler attribute, a profiling.Profiler.
+
+    If record is given, or if the environment variable CLITOGUI_RECORD is set,
+    the out_args of each accepted dialog are appended to that JSONL file,
+    to be replayed later by clitogui.batch.
+
     See InteractiveInterface for a living subclass example.
 
     """
 
-    def __init__(self, clitogui_actions):
+    def __init__(self, clitogui_actions, record: str = None):
         """Creation of the window, and associated layout"""
         super().__init__()
-        # Arguments final values from widgets
+        self.profiler = Profiler()
+        self.record = record or os.environ.get(RECORD_ENV)
+        # Arguments final values from widgets, by ArgumentSpec
         self.results = {}
         # CLI which will be generated from self.results
         self.out_args = []
+        # Option widgets by ArgumentSpec, the ones changed since last read,
+        #  and the command-line arguments computed for each option.
+        # Keyed by ArgumentSpec, not by dest: two subparsers may have
+        #  options with the same dest, but not the same ArgumentSpec.
+        self.widgets = {}
+        self._dirty = set()
+        self._cli_fragments = {}
         # Interface initialization
         self.parser = clitogui_actions
         self._version_argument = ""
-        self.setLayout(self._build_interface())
+        with self.profiler.phase("build_interface"):
+            self.setLayout(self._build_interface())
 
     def _build_interface(self):
         "Must return the main layout"
         # In case of subparser, layout containing widgets is different.
-        if self.parser.list_subparsers == []:
+        if not self.parser.list_subparsers:
             self.has_subparser = False
             self.widget_layout = QFormLayout()
             self.__create_widgets__(self.widget_layout, self.parser.arguments)
@@ -65,9 +90,16 @@ class Interface(QDialog):
             wid_options.setLayout(self.widget_layout)
         else:
             self.has_subparser = True
+            # Arguments shared by all subparsers are shown once, above the tabs
+            self.widget_layout = QFormLayout()
+            self.__create_widgets__(self.widget_layout, self.parser.arguments)
             self.tabs = QTabWidget()
             self.__create_tabs__()
-            wid_options = self.tabs
+            options_layout = QVBoxLayout()
+            options_layout.addLayout(self.widget_layout)
+            options_layout.addWidget(self.tabs)
+            wid_options = QWidget()
+            wid_options.setLayout(options_layout)
 
         # indicate version widget
         wid_version = self.__widget_for_version()
@@ -98,76 +130,78 @@ class Interface(QDialog):
 
     def _on_accept(self):
         "called when exited with 'OK'"
-        self.out_args = self.parse_gui()
+        with self.profiler.phase("parse_gui"):
+            self.out_args = self.parse_gui()
+        if self.record:
+            record_args(self.record, self.out_args)
 
     @classmethod
     def build_and_run(cls, *args, **kwargs):
+        start = time.perf_counter()
         app = QApplication(sys.argv)
+        app_duration = time.perf_counter() - start
         dialog = cls(*args, **kwargs)
+        dialog.profiler.record("qapplication", start, app_duration)
         dialog.__app = app  # if forgotten, will throw segfaults
-        dialog.exec()
+        with dialog.profiler.phase("dialog"):
+            dialog.exec()
         return dialog
 
     def parse_gui(self) -> list:
-        "Return the list of command-line arguments described by GUI state"
-        out_args = []
-        if self.has_subparser:
-            self.widget_layout = self.tabs.currentWidget().layout
-            current_tab_name = self.tabs.tabText(self.tabs.currentIndex())
-            # To remplace by a clean method
-            current_tab_arguments = [
-                arg
-                for arg in [
-                    x["list_actions"]
-                    for x in self.parser.list_subparsers
-                    if x["name"] == current_tab_name
-                ]
-            ][0]
-            self.parser.arguments = current_tab_arguments + self.parser.arguments
-            out_args.append(current_tab_name)
+        """Return the list of command-line arguments described by GUI state
 
-        self.__widget_recuperation__()
+        Only the widgets changed since the previous call are read again.
 
-        for arg in self.parser.arguments:
-            if (
-                arg["type"] is str
-                or arg["type"] is "file_path"
-                or arg["type"] is "directory_path"
-            ):
-                if arg["cli"] != []:
-                    out_args.append(arg["cli"])
-                out_args.append(self.results[arg["name"]])
-            elif arg["type"] is int:
-                if arg["cli"] != []:
-                    out_args.append(arg["cli"])
-                out_args.append(str(self.results[arg["name"]]))
-            elif arg["type"] is bool:
-                if self.results[arg["name"]]:
-                    out_args.append(arg["cli"])
-            elif arg["type"] == "append_action":
-                for command in self.results[arg["name"]].split(" "):
-                    out_args.append(arg["cli"])
-                    out_args.append(command)
-            elif arg["type"] == "count_action":
-                name, count = arg["cli"], self.results[arg["name"]]
-                # Keep a correspondance between what user see and reality:
-                #  the default for count_action gives a «base» value, to which
-                #  is added the number of found flags.
-                count -= arg["default"]
-                out_args.extend([name] * count)
-            elif arg["type"] == "version_action":
-                pass  # don't do anything ; version is treated elsewhere
-            elif callable(arg["type"]):
-                if arg["cli"] != []:
-                    out_args.append(arg["cli"])
-                out_args.append(
-                    arg["type"](self.results[arg["name"]])
-                )  # TODO: intercept argparse exception due to arg['type'] to print them in the GUI
-            else:
-                raise ValueError("Type {} is unhandled".format(arg["type"]))
+        """
+        self._read_values()
+        out_args = self.__cli_from_arguments__(self.parser.arguments)
+        subparser = self._current_subparser()
+        if subparser is not None:
+            out_args.append(subparser.name)
+            out_args += self.__cli_from_arguments__(subparser.list_actions)
         print("OUT ARGS:", out_args)
         return list(map(str, out_args))
 
+    def _read_values(self):
+        """Make self.results hold the values of the current arguments:
+        the ones of the widgets, or the default ones for a tab never shown"""
+        self.__widget_recuperation__()
+        if self.has_subparser:
+            tab = self.tabs.currentWidget()
+            if tab.form_layout is None:  # never shown: use the default values
+                for arg in tab.subparser.list_actions:
+                    if arg.type != "version_action" and arg not in self.results:
+                        self.results[arg] = value_for_type(
+                            arg.type, arg.default, arg.choices
+                        )
+
+    def _current_subparser(self):
+        "Return the SubparserSpec of the selected tab, or None"
+        if self.has_subparser:
+            return self.tabs.currentWidget().subparser
+        return None
+
+    def _current_arguments(self) -> list:
+        "Return the arguments of the parser, and of the selected subparser if any"
+        subparser = self._current_subparser()
+        return self.parser.arguments if subparser is None else subparser.arguments
+
+    def __cli_from_arguments__(self, arguments) -> list:
+        "Return the command-line arguments describing given arguments values"
+        out_args = []
+        for arg in arguments:
+            if arg.type == "version_action":
+                continue  # no widget, no value ; version is treated elsewhere
+            fragment = self._cli_fragments.get(arg)
+            if fragment is None:
+                fragment = self._cli_fragments[arg] = self.__cli_from_argument__(arg)
+            out_args += fragment
+        return out_args
+
+    def __cli_from_argument__(self, arg) -> list:
+        "Return the command-line arguments describing value of given argument"
+        return cli_from_value(arg, self.results[arg])
+
     def __compute_version(self):
         "If such a parameter exists, retrieve the returned version number"
         self.version_text = ""
@@ -188,7 +222,8 @@ class Interface(QDialog):
             return label
 
     def parsed_args(self):
-        return self.parser.parser.old_parse_args(self.out_args)
+        with self.profiler.phase("parse_args"):
+            return self.parser.parser.old_parse_args(self.out_args)
 
     def __create_widgets__(self, parent, arguments):
         """
@@ -199,21 +234,19 @@ class Interface(QDialog):
         """
         # Creation of arguments widgets
         for action in arguments:
-            if action["type"] == "version_action":
-                self._version_argument = action["cli"]
+            if action.type == "version_action":
+                self._version_argument = action.cli
                 continue  # don't propose a widget for that here
-            widget = widget_for_type(
-                action["type"], action["default"], action["choices"]
-            )
-            widget.setToolTip(action["help"])
-            if action["type"] in {"directory_path", "file_path"}:
+            widget = widget_for_type(action.type, action.default, action.choices)
+            widget.setToolTip(action.help)
+            if action.type in {"directory_path", "file_path"}:
                 path_callback = (
                     QFileDialog.getExistingDirectory
-                    if action["type"] == "directory_path"
+                    if action.type == "directory_path"
                     else QFileDialog.getOpenFileName
                 )
                 # Widget to keep clean the file path
-                path_file = QLineEdit(action["default"])
+                path_file = QLineEdit(action.default)
                 # Link between path_widget and widget
                 def closure(p):
                     widget.clicked.connect(lambda: p.setText(path_callback()[0]))
@@ -223,10 +256,22 @@ class Interface(QDialog):
                 hbox = QHBoxLayout()
                 hbox.addWidget(path_file)
                 hbox.addWidget(widget)
-                parent.addRow(action["name"], hbox)
+                self.__register_widget__(action, path_file)
+                parent.addRow(action.name, hbox)
             else:
-                self._on_widget_creation(widget, action["name"])
-                parent.addRow(action["name"], widget)
+                self.__register_widget__(action, widget)
+                self._on_widget_creation(widget, action.name)
+                parent.addRow(action.name, widget)
+
+    def __register_widget__(self, arg, widget: QWidget):
+        "Keep given option widget of given ArgumentSpec, and track its changes"
+        self.widgets[arg] = widget
+        self._dirty.add(arg)
+        # connected before _on_widget_creation, so that it is marked dirty
+        #  before any reaction of subclasses to the change ; the dialog itself
+        #  is not referenced, so that it is not kept alive by its widgets
+        dirty = self._dirty
+        change_signal(widget).connect(lambda *_: dirty.add(arg))
 
     def _on_widget_creation(self, widget, option_name):
         "Called for each option widget created ; do nothing ; to be overriden"
@@ -235,39 +280,96 @@ class Interface(QDialog):
     def __create_tabs__(self):
         """
         Create in ExtractedParser object the number of tabs needed for
-        subparsers.
+        subparsers. Their widgets are created when first shown.
         """
         for subparser in self.parser.list_subparsers:
             tab = QWidget()
-            tab.layout = QFormLayout()
-            self.__create_widgets__(tab.layout, subparser["list_actions"])
-            self.__create_widgets__(tab.layout, self.parser.arguments)
-            tab.setLayout(tab.layout)
-            self.tabs.addTab(tab, subparser["name"])
+            tab.subparser = subparser
+            tab.form_layout = None  # will be created by __fill_tab__
+            self.tabs.addTab(tab, subparser.name)
+        self.tabs.currentChanged.connect(self.__fill_tab__)
+        self.__fill_tab__(self.tabs.currentIndex())
+
+    def __fill_tab__(self, index: int):
+        "Create the widgets of the index-th tab, if not already done"
+        tab = self.tabs.widget(index)
+        if tab is None or tab.form_layout is not None:
+            return
+        tab.form_layout = QFormLayout()
+        self.__create_widgets__(tab.form_layout, tab.subparser.list_actions)
+        tab.setLayout(tab.form_layout)
 
     def __widget_recuperation__(self):
         """
-        Allow to file ExtractedParser.results with the values of widgets
-        contained into widget_layout.
+        Fill self.results with the values of the widgets changed since
+        the last call, and forget their command-line arguments.
         """
-        # Each line in GUI's tab is an item for CLI
-        for i in range(self.widget_layout.rowCount()):
-            item = self.widget_layout.itemAt(i, QFormLayout.FieldRole)
-            # 2 cases expected: single widget, or hbox layout
-            # If path_file or path_directory
-            if item.widget() is None:
-                widget = item.layout()
-                value = widget.metaObject().userProperty().read(widget)
-            # Standard widget case
-            elif item.layout() is None:
-                widget = item.widget()
-                value = widget.metaObject().userProperty().read(widget)
-            # None of the expected cases
-            else:
-                raise ValueError("{}-th widget is {}".format(i, item))
-            # Find widget label
-            label = self.widget_layout.labelForField(widget).text()
-            self.results[label] = value
+        dirty = tuple(self._dirty)
+        self._dirty.clear()
+        for arg in dirty:
+            widget = self.widgets[arg]
+            self.results[arg] = widget.metaObject().userProperty().read(widget)
+            self._cli_fragments.pop(arg, None)
+
+
+def record_args(path: str, out_args: list):
+    "Append given command-line arguments to given JSONL file"
+    record = {"args": out_args, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(path, "a") as fd:
+        fd.write(json.dumps(record) + "\n")
+
+
+def cli_from_values(parser, subparser, values: dict) -> list:
+    """Return the command-line arguments giving given values, by ArgumentSpec,
+    to the arguments of given ExtractedParser, and of given SubparserSpec if any"""
+    out_args = []
+    for arg in parser.arguments:
+        out_args += cli_from_value(arg, values.get(arg))
+    if subparser is not None:
+        out_args.append(subparser.name)
+        for arg in subparser.list_actions:
+            out_args += cli_from_value(arg, values.get(arg))
+    return list(map(str, out_args))
+
+
+def cli_from_value(arg, value: object) -> list:
+    """Return the command-line arguments giving given value to given ArgumentSpec,
+    the value being as held by its option widget"""
+    out_args = []
+    if arg.type is str or arg.type == "file_path" or arg.type == "directory_path":
+        if arg.cli != []:
+            out_args.append(arg.cli)
+        out_args.append(value)
+    elif arg.type is int:
+        if arg.cli != []:
+            out_args.append(arg.cli)
+        out_args.append(str(value))
+    elif arg.type is bool:
+        if value:
+            out_args.append(arg.cli)
+    elif arg.type == "append_action":
+        for command in value.split(" "):
+            out_args.append(arg.cli)
+            out_args.append(command)
+    elif arg.type == "count_action":
+        name, count = arg.cli, value
+        # Keep a correspondance between what user see and reality:
+        #  the default for count_action gives a «base» value, to which
+        #  is added the number of found flags.
+        count -= arg.default
+        out_args.extend([name] * count)
+    elif arg.type == "version_action":
+        pass  # don't do anything ; version is treated elsewhere
+    elif callable(arg.type):
+        if arg.cli != []:
+            out_args.append(arg.cli)
+        out_args.append(
+            arg.type(value)
+        )  # TODO: intercept argparse exception due to arg['type'] to print them in the GUI
+    else:
+        raise ValueError("Type {} is unhandled".format(arg.type))
+
+    return out_args
 
 
 def widget_for_type(
@@ -282,7 +384,7 @@ def widget_for_type(
                 widget.setCheckState(Qt.Checked if default_value else Qt.Unchecked)
             except:
                 widget.setCheckState(False)
-        elif wtype is "file_path" or wtype is "directory_path":
+        elif wtype == "file_path" or wtype == "directory_path":
             widget = QPushButton("...")
         elif wtype is str:
             widget = QLineEdit(default_value)
@@ -324,3 +426,44 @@ def widget_for_type(
         widget.addItems(tuple(map(str, choices)))
         widget.setCurrentText(str(default_value))
     return widget
+
+
+def change_signal(widget: QWidget):
+    "Return the signal emitted when the value of given option widget changes"
+    if isinstance(widget, QLineEdit):
+        return widget.textChanged
+    elif isinstance(widget, QSpinBox):
+        return widget.valueChanged
+    elif isinstance(widget, QCheckBox):
+        return widget.stateChanged
+    elif isinstance(widget, QComboBox):
+        return widget.currentTextChanged
+    raise TypeError("Unhandled widget type: {}".format(type(widget)))
+
+
+def value_for_type(wtype: type, default_value: object, choices: iter = None) -> object:
+    """Return the value held by a widget created by widget_for_type
+    with the same parameters, without creating it"""
+    if choices is not None:
+        choices = tuple(map(str, choices))
+        if str(default_value) in choices or not choices:
+            return str(default_value)
+        return choices[0]
+    elif wtype is bool:
+        return bool(default_value)
+    elif wtype in {"file_path", "directory_path", "append_action"} or wtype is str:
+        return default_value or ""
+    elif wtype is int:
+        return int(default_value or 0)
+    elif wtype == "count_action":
+        return int(default_value)
+    elif callable(wtype):  # probably an user-defined function
+        fullargs = inspect.getfullargspec(wtype)
+        atype = fullargs.annotations.get(fullargs.args[0] if fullargs.args else None)
+        if atype is None:
+            raise TypeError(
+                "Unhandled type 'custom function {}'".format(wtype.__name__)
+            )
+        return value_for_type(atype, default_value, choices)
+    else:
+        raise TypeError("Unhandled type: {}".format(wtype))
@@ -1,4 +1,13 @@
-"""Implementation of a generalist image viewer"""
+"""Implementation of a generalist image viewer
+
+Very large images are shown by tiles: only the tiles visible in the view
+are converted for Qt, from a pyramid of downsampled versions of the image
+matching the zoom level, computed in the background.
+
+"""
+
+import sys
+import math
 
 try:
     from PIL import Image
@@ -15,11 +24,41 @@ except ImportError:
     from PyQt5.QtCore import *
     from PyQt5.QtGui import *
 
+from . import profiling
+from .cache import ResultCache, IMAGE_MODE_BAND_SIZE
+from .runner import ThreadRunner
+
+# images having more pixels than that are shown by tiles
+TILED_MIN_PIXELS = 4096 * 4096
+# width and height of the tiles, in pixels
+TILE_SIZE = 512
+# maximal number of tiles converted for Qt kept in memory (256 MiB for RGBA tiles)
+TILE_CACHE_TILES = 256
+
+# QImage formats of the PIL image modes whose raw pixels can be used as is
+QIMAGE_FORMATS = {
+    "L": QImage.Format_Grayscale8,
+    "RGB": QImage.Format_RGB888,
+    "RGBA": QImage.Format_RGBA8888,
+    "RGBX": QImage.Format_RGBX8888,
+}
+# pixels of I;16 images are little-endian, those of Format_Grayscale16 native
+#  (ImageQt multiplies them by 256 for PyQt5, overflowing values above 255)
+if sys.byteorder == "little" and hasattr(QImage, "Format_Grayscale16"):
+    QIMAGE_FORMATS["I;16"] = QImage.Format_Grayscale16
+# QImage formats of the numpy arrays of uint8, by shape after (height, width)
+ARRAY_QIMAGE_FORMATS = {
+    (1,): QImage.Format_Grayscale8,
+    (3,): QImage.Format_RGB888,
+    (4,): QImage.Format_RGBA8888,
+}
+
 
 class ImageView(QGraphicsView):
     def __init__(self):
         super().__init__()
         self.setScene(QGraphicsScene())
+        self.png_item = None
         self.setBackgroundBrush(QBrush(Qt.white))
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
@@ -46,16 +85,209 @@ class ImageView(QGraphicsView):
         self.translate(delta.x(), delta.y())
 
     def set_image(self, image: Image):
-        # self.png_item = QGraphicsSvgItem('tmp.svg')
-        self.image = image
-        self.qimage = ImageQt.ImageQt(self.image)
-        self.qpixmap = QPixmap.fromImage(self.qimage)
-        self.png_item = QGraphicsPixmapItem(self.qpixmap)
-        self.scene().clear()
-        self.scene().addItem(self.png_item)
+        "Show given PIL image, or numpy array of pixels"
+        tiled = (
+            Image is not None
+            and isinstance(image, Image.Image)
+            and image.width * image.height > TILED_MIN_PIXELS
+        )
+        item_class = TiledImageItem if tiled else ImageItem
+        if self.png_item is not None and not isinstance(self.png_item, item_class):
+            self.scene().removeItem(self.png_item)  # the other kind of item is needed
+            self.png_item = None
+        if self.png_item is None:
+            self.png_item = item_class(image)
+            self.scene().addItem(self.png_item)
+        else:  # keep the item, so the zoom and scroll position are kept too
+            self.png_item.set_image(image)
         self.scene().setSceneRect(self.png_item.sceneBoundingRect())
 
 
+class ImageItem(QGraphicsItem):
+    """Graphics item drawing an image as a QImage sharing its pixels if possible
+
+    Unlike a QGraphicsPixmapItem, no pixmap copy of the image is made.
+
+    """
+
+    def __init__(self, image: Image, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)  # for exposedRect
+        self.set_image(image)
+
+    def set_image(self, image: Image):
+        self.prepareGeometryChange()
+        with profiling.phase("image_conversion"):
+            self.qimage = to_qimage(image)
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self.qimage.width(), self.qimage.height())
+
+    def paint(self, painter: QPainter, option, widget=None):
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        painter.drawImage(exposed, self.qimage, exposed)
+
+
+class TiledImageItem(QGraphicsItem):
+    """Graphics item drawing a PIL image by tiles, at the zoom level of the view.
+
+    Level 0 of the pyramid is the image itself, level n+1 is level n
+    downsampled by 2. Levels are computed in a background thread when the
+    image is set ; the parts of the view needing a level not computed yet
+    are drawn once it is. Tiles are converted to QImage when first visible,
+    the last ones being kept in cache.
+
+    """
+
+    def __init__(self, image: Image, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)  # for exposedRect
+        self.tiles = ResultCache(TILE_CACHE_TILES)
+        self.builder = ThreadRunner()
+        self.builder.yielded.connect(self._on_level_built)
+        self.set_image(image)
+
+    def set_image(self, image: Image):
+        self.prepareGeometryChange()
+        image.load()  # not concurrently by the builder and the GUI thread
+        self.levels = [image]
+        self.max_level = max(0, math.ceil(math.log2(max(image.size) / TILE_SIZE)))
+        self.tiles.clear()
+        if self.max_level:  # levels of the previous image are discarded
+            self.builder.submit(pyramid_levels, image, self.max_level)
+        else:
+            self.builder.discard()
+        self.update()
+
+    def _on_level_built(self, level: Image):
+        self.levels.append(level)
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, *self.levels[0].size)
+
+    def level_index(self, scale: float) -> int:
+        "Return the index of the level to draw at given scale of the view"
+        # the most downsampled level still having more pixels than the screen
+        index = 0 if scale >= 1 else int(math.log2(1 / scale))
+        return min(index, self.max_level)
+
+    def visible_tiles(self, index: int, rect: QRectF) -> iter:
+        """Yield (column, row, target, source) for the tiles of the index-th
+        level intersecting given rectangle of the item, target being the
+        rectangle of the tile in the item, and source the one in its QImage"""
+        level = self.levels[index]
+        # ratios between the coordinates in the level, and in the item
+        ratio_x = self.levels[0].width / level.width
+        ratio_y = self.levels[0].height / level.height
+        rect = rect.intersected(self.boundingRect())
+        first_column = int(rect.left() / ratio_x) // TILE_SIZE
+        last_column = int(math.ceil(rect.right() / ratio_x)) // TILE_SIZE
+        first_row = int(rect.top() / ratio_y) // TILE_SIZE
+        last_row = int(math.ceil(rect.bottom() / ratio_y)) // TILE_SIZE
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                width = min(TILE_SIZE, level.width - column * TILE_SIZE)
+                height = min(TILE_SIZE, level.height - row * TILE_SIZE)
+                if width <= 0 or height <= 0:
+                    continue
+                target = QRectF(
+                    column * TILE_SIZE * ratio_x,
+                    row * TILE_SIZE * ratio_y,
+                    width * ratio_x,
+                    height * ratio_y,
+                )
+                yield column, row, target, QRectF(0, 0, width, height)
+
+    def tile(self, index: int, column: int, row: int) -> QImage:
+        "Return the QImage of given tile of the index-th level"
+        key = index, column, row
+        tile = self.tiles.get(key)
+        if tile is None:
+            level = self.levels[index]
+            left, top = column * TILE_SIZE, row * TILE_SIZE
+            box = (
+                left,
+                top,
+                min(left + TILE_SIZE, level.width),
+                min(top + TILE_SIZE, level.height),
+            )
+            with profiling.phase("image_conversion"):
+                tile = to_qimage(level.crop(box))
+            self.tiles.put(key, tile)
+        return tile
+
+    def paint(self, painter: QPainter, option, widget=None):
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            painter.worldTransform()
+        )
+        index = self.level_index(scale)
+        if index >= len(self.levels):
+            return  # still being computed ; the item is updated once it is
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, index > 0)
+        for column, row, target, source in self.visible_tiles(
+            index, option.exposedRect
+        ):
+            painter.drawImage(target, self.tile(index, column, row), source)
+
+
+def pyramid_levels(image: Image, nb_levels: int) -> iter:
+    "Yield the nb_levels levels following given image in its pyramid"
+    for _ in range(nb_levels):
+        if image.mode in {"1", "P"}:  # can't be averaged as is
+            image = image.convert("RGBA" if image.mode == "P" else "L")
+        image = image.reduce(2)
+        yield image
+
+
+def to_qimage(image) -> QImage:
+    """Return a QImage showing given PIL image, or numpy array of pixels
+
+    Pixels are shared, without copy, with:
+        - C-contiguous numpy arrays of uint8, of shape (height, width) for
+          grayscale, or (height, width, 3 or 4) for RGB or RGBA
+        - PIL images of the QIMAGE_FORMATS modes loaded from the caches,
+          that keep their raw pixels in their _raw_buffer attribute
+    Other PIL images of these modes are copied once, others are converted by ImageQt.
+    The returned QImage keeps a reference to the buffer it uses.
+
+    """
+    if Image is not None and isinstance(image, Image.Image):
+        if image.mode == "1":  # ImageQt gives it no color table
+            image = image.convert("L")
+        qformat = QIMAGE_FORMATS.get(image.mode)
+        if qformat is None:  # needs a conversion
+            return ImageQt.ImageQt(image)
+        buffer = getattr(image, "_raw_buffer", None)
+        if buffer is None:
+            buffer = image.tobytes()
+        width, height = image.size
+        band_size = IMAGE_MODE_BAND_SIZE.get(image.mode, 1)
+        bytes_per_line = width * len(image.getbands()) * band_size
+    elif hasattr(image, "__array_interface__"):  # numpy array
+        if len(image.shape) == 2:
+            qformat = QImage.Format_Grayscale8
+        else:
+            qformat = ARRAY_QIMAGE_FORMATS.get(image.shape[2:], None)
+        if qformat is None or str(image.dtype) != "uint8":
+            raise TypeError(
+                "Unhandled array of shape {} and type {}".format(
+                    image.shape, image.dtype
+                )
+            )
+        if not image.flags["C_CONTIGUOUS"]:
+            image = image.copy()
+        buffer = image.data
+        height, width = image.shape[:2]
+        bytes_per_line = image.strides[0]
+    else:
+        raise TypeError("Unhandled image type: {}".format(type(image)))
+    qimage = QImage(buffer, width, height, bytes_per_line, qformat)
+    qimage._buffer = buffer  # the QImage doesn't own the pixels
+    return qimage
+
+
 class ImageViewer(QWidget):
     def __init__(self, image: Image = None, parent=None):
         super().__init__(parent=parent)
@@ -3,9 +3,18 @@
 import sys
 import inspect
 import argparse
-from .gui import Interface
+import math
+import traceback
+from collections import OrderedDict
+from .gui import Interface, cli_from_values, change_signal
 from .image_viewer import ImageViewer
-from itertools import zip_longest
+from .list_view import ListViewer
+from .table_view import TableViewer, is_table
+from .text_view import TextViewer
+from .sweep import SweepDialog
+from .arrays import is_array, to_pixels
+from .runner import ThreadRunner, ProcessRunner, RunContext, run_callback
+from .cache import ResultCache, DiskCache, sizeof_output
 
 try:
     from PIL import Image
@@ -20,6 +29,18 @@ except ImportError:
     from PyQt5.QtCore import *
 
 
+_MISSING = object()  # marker of a cache miss
+
+# maximal number of pixels of the images shown in preview mode
+PREVIEW_MAX_PIXELS = 2048 * 2048
+# lists longer than that are shown in a ListViewer, rendering only visible rows
+LONG_LIST_LENGTH = 100
+# strings longer than that are shown in a TextViewer, loaded in the background
+LONG_TEXT_LENGTH = 10000
+# memory of the values kept shown in the tabs that are not the current one
+TAB_CACHE_BYTES = 512 * 2 ** 20
+
+
 def clear_layout(layout):
     "Remove everything in a given layout"
     if layout is not None:
@@ -33,6 +54,14 @@ def clear_layout(layout):
         layout.deleteLater()
 
 
+def clear_widgets(layout):
+    "Remove the widgets of a given layout, keeping the layout"
+    while layout.count():
+        widget = layout.takeAt(0).widget()
+        widget.setParent(None)
+        widget.deleteLater()
+
+
 class InteractiveInterface(Interface):
     """Automatized GUI using ExtractedParser object, with interactive visualization of outputs
 
@@ -44,6 +73,9 @@ class InteractiveInterface(Interface):
 
     """
 
+    # available ways to run the callback when updating the view
+    RUNNERS = {None: None, "thread": ThreadRunner, "process": ProcessRunner}
+
     def __init__(
         self,
         clitogui_actions,
@@ -53,6 +85,21 @@ class InteractiveInterface(Interface):
         tab_names: iter = (),
         autorun: bool = True,
         minsize: (int, int) = (300, 300),
+        executor: str = None,
+        debounce_ms: int = 0,
+        cache_size: int = 0,
+        cache_bytes: int = None,
+        disk_cache: bool or str = False,
+        disk_cache_bytes: int = 2 ** 30,
+        timeout: float = None,
+        stream: bool or str = False,
+        show_timings: bool = False,
+        array_display: dict = None,
+        preview: float = None,
+        progress: bool = False,
+        sweep: bool = False,
+        sweep_workers: int = None,
+        record: str = None,
     ):
         """Creation of the window, and associated layout
 
@@ -62,8 +109,57 @@ class InteractiveInterface(Interface):
         tab_names -- if there is tabs, use the strings in that iterable to name them
         autorun -- if True, will update the output view each time an option is changed
         minsize -- minimal size of the output view
+        executor -- how to run the callback when updating the view:
+            None to run it in the GUI thread, "thread" to run it in a worker thread,
+            "process" to run it in a worker process (callback must be picklable)
+        timeout -- with an executor, number of seconds after which a run is
+            reported as failed ; the "process" executor also terminates it
+        stream -- if the callback returns a generator, show its items as soon as
+            they are yielded ; implies the "thread" executor if none is given ;
+            "lines" shows the yielded strings as the lines of a single text
+        debounce_ms -- if autorun, wait for that many milliseconds without any
+            option change before running the callback, so that a burst of
+            changes (like typing a number) leads to only one run
+        cache_size -- number of callback outputs to keep in memory, so that
+            already seen options values are not computed again ; 0 disables it
+        cache_bytes -- maximal memory used by the kept outputs, or None for no limit
+        disk_cache -- if True, also keep the callback outputs on disk (in
+            ~/.cache/clitogui), so that they are reused across sessions ;
+            can also be the directory to use
+        disk_cache_bytes -- maximal disk usage of the disk cache
+        show_timings -- show in a status bar the time spent in each phase of the
+            last update of the view
+        array_display -- options of the display of numpy arrays, given to
+            arrays.to_pixels, such as {"scaling": "percentile", "colormap": "hot"}
+        preview -- scale factor in ]0;1] of the previews: if given, the updates
+            of the view call the callback with args._preview set to it, so that
+            it can work at a reduced resolution, and the images it returns are
+            downscaled to PREVIEW_MAX_PIXELS before display ; the full quality
+            output is only computed on accept, with args._preview set to None
+        progress -- give the callback a runner.RunContext as args._run, through
+            which it reports its progress and learns that it has been cancelled ;
+            a progress bar and a cancel button are shown while it runs ;
+            implies the "thread" executor if none is given
+        sweep -- add a button opening a sweep.SweepDialog, running the callback
+            over all combinations of lists of values of the options
+        sweep_workers -- maximal number of callbacks running at once in a sweep ;
+            defaults to the number of processors
+        record -- JSONL file where the out_args of the accepted dialogs are
+            appended, to be replayed by clitogui.batch
 
         """
+        if executor not in self.RUNNERS:
+            raise ValueError(
+                "Unknown executor {}. Valid values: {}".format(
+                    repr(executor), ", ".join(map(repr, self.RUNNERS))
+                )
+            )
+        if preview is not None and not 0 < preview <= 1:
+            raise ValueError("preview must be a scale factor in ]0;1]")
+        if stream and executor == "process":
+            raise ValueError("Outputs can't be streamed from the process executor")
+        elif (stream or progress) and executor is None:
+            executor = "thread"  # the callback must run away from the GUI
         self.callback, self.tabulate, self.tab_names, self.autorun, self.minsize = (
             callback,
             tabulate,
@@ -71,8 +167,29 @@ class InteractiveInterface(Interface):
             autorun,
             tuple(map(int, minsize)),
         )
+        self.stream = stream if stream == "lines" else bool(stream)
+        self.show_timings = bool(show_timings)
+        self.array_display = dict(array_display or {})
+        self.preview = preview
+        self.progress = bool(progress)
+        self.sweep, self.sweep_workers = bool(sweep), sweep_workers
+        self._streamed_output = []  # items of the running generator already shown
+        self.debounce_ms = int(debounce_ms)
+        self.cache = ResultCache(cache_size, cache_bytes)
+        self.disk_cache = None
+        if disk_cache:
+            self.disk_cache = DiskCache(
+                None if disk_cache is True else disk_cache, disk_cache_bytes
+            )
         self.last_callback_output = ()  # nothing to show
-        super().__init__(clitogui_actions)
+        self.runner = None
+        if self.RUNNERS[executor]:
+            self.runner = self.RUNNERS[executor](timeout=timeout)
+            self.runner.finished.connect(self._on_runner_output)
+            self.runner.failed.connect(self._on_callback_error)
+            self.runner.yielded.connect(self._on_runner_yielded)
+            self.runner.progressed.connect(self._set_progress)
+        super().__init__(clitogui_actions, record=record)
 
     def _build_interface(self):
         left_layout = super()._build_interface()
@@ -81,6 +198,17 @@ class InteractiveInterface(Interface):
         self.apply_button.clicked.connect(self.update_view)
         self.apply_button.setDefault(True)  # make it the default button of the gui
         self.buttons.addButton(self.apply_button, QDialogButtonBox.ButtonRole.ApplyRole)
+        if self.sweep:
+            self.sweep_button = QPushButton("Sweep…", self)
+            self.sweep_button.clicked.connect(self.open_sweep)
+            self.buttons.addButton(
+                self.sweep_button, QDialogButtonBox.ButtonRole.ActionRole
+            )
+        # Coalesce the bursts of option changes into one single autorun
+        self.autorun_timer = QTimer(self)
+        self.autorun_timer.setSingleShot(True)
+        self.autorun_timer.setInterval(self.debounce_ms)
+        self.autorun_timer.timeout.connect(self.update_view)
 
         # Add a new space to print the output
         self.output_view = self.make_new_outview()
@@ -89,29 +217,46 @@ class InteractiveInterface(Interface):
             QHBoxLayout()
         )  # will replace the previous one, to include the output view
         new_main_layout.addLayout(left_layout)
-        new_main_layout.addWidget(self.output_view)
+        if self.progress:
+            self.progress_bar = QProgressBar(self)
+            self.progress_bar.setRange(0, 1000)
+            self.cancel_button = QPushButton("Cancel run", self)
+            self.cancel_button.clicked.connect(self.cancel_run)
+            progress_layout = QHBoxLayout()
+            progress_layout.addWidget(self.progress_bar)
+            progress_layout.addWidget(self.cancel_button)
+            output_layout = QVBoxLayout()
+            output_layout.addWidget(self.output_view)
+            output_layout.addLayout(progress_layout)
+            new_main_layout.addLayout(output_layout)
+            self._set_progress(None)
+        else:
+            new_main_layout.addWidget(self.output_view)
+        self.status_bar = None
+        if self.show_timings:
+            self.status_bar = QStatusBar(self)
+            with_status_layout = QVBoxLayout()
+            with_status_layout.addLayout(new_main_layout)
+            with_status_layout.addWidget(self.status_bar)
+            return with_status_layout
         return new_main_layout
 
     def _on_widget_creation(self, widget, option_name):
         "if autorun, run the callback when a new value has been set"
         if self.autorun:
-            if isinstance(widget, QLineEdit):
-                widget.textChanged.connect(self.update_view)
-            elif isinstance(widget, QSpinBox):
-                widget.valueChanged.connect(self.update_view)
-            elif isinstance(widget, QCheckBox):
-                widget.stateChanged.connect(self.update_view)
-            elif isinstance(widget, QComboBox):
-                widget.currentTextChanged.connect(self.update_view)
-            else:
-                raise NotImplementedError(
-                    "Widget of type {} cannot be triggered on autorun".format(
-                        type(widget)
-                    )
-                )
+            change_signal(widget).connect(self.schedule_update_view)
+
+    def schedule_update_view(self):
+        "Update the view once no option changed for debounce_ms milliseconds"
+        if self.runner and self.runner.running:  # its output is already outdated
+            self.cancel_run()
+        if self.debounce_ms > 0:
+            self.autorun_timer.start()  # restart the countdown if already running
+        else:
+            self.update_view()
 
     def make_new_outview(self):
-        output_view = OutputView(self.tabulate, self.tab_names)
+        output_view = OutputView(self.tabulate, self.tab_names, self.array_display)
         output_view.setMinimumSize(*self.minsize)
         output_view.show_values(self.last_callback_output)
         return output_view
@@ -126,86 +271,552 @@ class InteractiveInterface(Interface):
         parsed._output = self.last_callback_output
         return parsed
 
+    def exec(self):
+        try:
+            super().exec()
+        finally:  # don't let a running callback outlive the dialog
+            if self.runner:
+                self.runner.shutdown()
+
     def _on_accept(self):
         super()._on_accept()
-        self.last_callback_output = self.callback(
-            super().parsed_args()
-        )  # remember the outputs
-        if inspect.isgenerator(self.last_callback_output):
-            self.last_callback_output = tuple(self.last_callback_output)
+        if self.runner:  # running previews are now irrelevant
+            self.runner.discard()
+            self._set_progress(None)
+        self.last_callback_output = self._callback_output()  # full quality
+
+    def _callback_output(self, preview: float = None) -> object:
+        "Return the output of the callback for current out_args, cached if possible"
+        key, disk_key = self._cache_keys(preview)
+        output = self.cache.get(key, _MISSING)
+        if output is _MISSING:
+            parsed_args = self._callback_args(preview)
+            with self.profiler.phase("callback"):
+                output = run_callback(
+                    self.callback, parsed_args, self.disk_cache, disk_key
+                )
+            self.cache.put(key, output)  # remember the outputs
+        return output
+
+    def _callback_args(
+        self, preview: float = None, context: RunContext = None, out_args: list = None
+    ):
+        """Return the parsed args to give to the callback, telling it if it is
+        a preview, and giving it the context of its run
+
+        out_args -- the command-line arguments to parse, if not the current ones
+
+        """
+        if out_args is None:
+            parsed = super().parsed_args()
+        else:
+            parsed = self.parser.parser.old_parse_args(out_args)
+        if self.preview:
+            parsed._preview = preview
+        if self.progress:
+            parsed._run = context or RunContext()
+        return parsed
+
+    def _cache_keys(
+        self, preview: float = None, out_args: list = None, values: dict = None
+    ) -> (tuple, str or None):
+        """Return the keys identifying the callback output for given out_args
+        and values of the options, by default the current ones"""
+        out_args = self.out_args if out_args is None else out_args
+        values = self.results if values is None else values
+        key = self.callback, tuple(out_args), preview
+        disk_key = None
+        if self.disk_cache:
+            paths = (
+                values.get(arg)
+                for arg in self._current_arguments()
+                if arg.type in {"file_path", "directory_path"}
+            )
+            out_args = list(out_args)
+            if preview:
+                out_args.append(("preview", preview))
+            disk_key = self.disk_cache.key(self.callback, out_args, paths)
+        return key, disk_key
 
     def update_view(self):
         "Parse GUI to get args, call callback with it"
-        self._on_accept()  # compute the new output data
-        # create the view accordingly
-        old_outview = self.layout().takeAt(1).widget()
-        old_outview.setParent(None)
-        old_outview.deleteLater()
-        self.output_view = self.make_new_outview()
-        self.layout().addWidget(self.output_view)
-        assert self.layout().itemAt(1).widget() is self.output_view
+        self.autorun_timer.stop()  # any pending autorun is now useless
+        self.profiler.new_run()
+        with self.profiler.phase("parse_gui"):
+            self.out_args = self.parse_gui()
+        if self.runner is None:
+            self._on_callback_output(self._callback_output(self.preview))
+            return
+        key, disk_key = self._cache_keys(self.preview)
+        output = self.cache.get(key, _MISSING)
+        if output is _MISSING:  # the view will be updated once the runner is done
+            self._pending_key = key
+            self._streamed_output = []
+            context = self.runner.new_context() if self.progress else None
+            parsed_args = self._callback_args(self.preview, context)
+            self.profiler.begin("callback")  # ended when the runner is done
+            self.runner.submit(
+                run_callback,
+                self.callback,
+                parsed_args,
+                self.disk_cache,
+                disk_key,
+                not self.stream,
+                context=context,
+            )
+            self._set_progress(0.0)
+        else:
+            self.runner.discard()
+            self._set_progress(None)
+            self._on_callback_output(output)
+
+    def open_sweep(self) -> SweepDialog:
+        "Open a window running the callback over combinations of option values"
+        dialog = SweepDialog(self, self.sweep_workers)
+        dialog.show()
+        return dialog
+
+    def _sweep_jobs(self, combinations: [dict], context: RunContext = None) -> list:
+        """Return, for each combination of option values, the combination,
+        the key of its output in the cache, and the (function, args) job
+        computing its output ; other options keep their values of the GUI
+
+        combinations -- {ArgumentSpec: value} dicts, the values being
+            as held by the option widgets
+
+        """
+        self._read_values()
+        subparser = self._current_subparser()
+        jobs = []
+        for combination in combinations:
+            values = dict(self.results)
+            values.update(combination)
+            out_args = cli_from_values(self.parser, subparser, values)
+            key, disk_key = self._cache_keys(self.preview, out_args, values)
+            parsed_args = self._callback_args(self.preview, context, out_args)
+            job = run_callback, (self.callback, parsed_args, self.disk_cache, disk_key)
+            jobs.append((combination, key, job))
+        return jobs
+
+    def cancel_run(self):
+        "Stop the running callback, if any ; the view keeps showing previous output"
+        if self.runner and self.runner.running:
+            self.runner.discard()
+            self.profiler.end("callback")
+            self._set_progress(None)
+
+    def _set_progress(self, fraction: float or None, message: str = ""):
+        "Show given progress of the running callback ; None if it's not running"
+        if not self.progress:
+            return
+        self.progress_bar.setVisible(fraction is not None)
+        self.cancel_button.setVisible(fraction is not None)
+        if fraction is not None:
+            self.progress_bar.setValue(round(fraction * 1000))
+            self.progress_bar.setFormat((message + " " if message else "") + "%p%")
+
+    def _on_runner_output(self, output: object):
+        self.profiler.end("callback")
+        self._set_progress(None)
+        self.cache.put(self._pending_key, output)
+        if self._streamed_output:  # already shown
+            self.last_callback_output = output
+            if self.stream != "lines":
+                self.output_view.truncate(len(self._streamed_output))
+            self._streamed_output = []
+            self._show_timings()
+        else:
+            self._on_callback_output(output)
+
+    def _on_runner_yielded(self, item: object):
+        "Show given item, just yielded by the callback, after the previous ones"
+        with self.profiler.phase("render"):
+            if self.stream == "lines":
+                self._show_line(item)
+            else:
+                self.output_view.set_entry(
+                    len(self._streamed_output), self._shown(item), self.tabulate
+                )
+        self._streamed_output.append(item)
+
+    def _show_line(self, line: object):
+        "Show given line, just yielded by the callback, after the previous ones"
+        line = _without_newline(str(line))
+        if self._streamed_output:
+            self.output_view.append_text("\n" + line)
+        else:
+            self.output_view.show_text(line)
+
+    def _on_callback_output(self, output: object):
+        "Show given callback output in the output view"
+        self.last_callback_output = output
+        with self.profiler.phase("render"):
+            self.output_view.show_values(self._shown(output))
+        self._show_timings()
+
+    def _shown(self, output: object) -> object:
+        "Return given callback output as it must be shown"
+        if self.stream == "lines":
+            return lines_text(output)
+        elif self.preview:  # no need to show more pixels than computed
+            return downscaled_value(output)
+        return output
+
+    def _on_callback_error(self, error: Exception):
+        "Show given exception, raised by the callback, in the output view"
+        self.profiler.end("callback")
+        self._set_progress(None)
+        self.output_view.show_error(error)
+        self._show_timings()
+
+    def _show_timings(self):
+        "Show in the status bar, if any, the time spent in each phase of last run"
+        if self.status_bar is not None:
+            self.status_bar.showMessage(self.profiler.summary())
 
 
 class OutputView(QFrame):
     """Container of widgets showing the outputs of the InteractiveInterface.callback.
 
-    A new instance is created each time the callback is called.
+    An output is shown as a sequence of entries, each one in its own tab
+    if tabulated. When a new output is shown, the entries having the same
+    shape as the previous ones are updated in place: widgets are created
+    or destroyed only when the shape of the output changes.
+
+    The widgets of a tab are built only when the tab is shown. When the values
+    shown in the other tabs use more than max_tab_bytes, the widgets of the tabs
+    viewed least recently are released, to be built again when shown.
 
     """
 
-    def __init__(self, tabulate: bool, tab_names: iter):
+    def __init__(
+        self,
+        tabulate: bool,
+        tab_names: iter,
+        array_display: dict = None,
+        max_tab_bytes: int = TAB_CACHE_BYTES,
+    ):
         super().__init__()
         self.tabulate = tabulate
         self.tab_names = tab_names
+        self.array_display = array_display or {}  # options of arrays.to_pixels
+        self.max_tab_bytes = max_tab_bytes
+        self.tabs = None  # the QTabWidget holding the entries, if tabulated
+        self.entries = []  # (shape, container, leaf widgets) of each entry
+        self.values = []  # value of each entry
+        self.stale = set()  # entries whose widgets don't show their value yet
+        self.viewed = OrderedDict()  # entry -> size, least recently viewed first
+        self.error_label = None
+        self.setLayout(QVBoxLayout())
 
     def show_values(self, values: object):
         "Update internal widgets"
-        widgets = tuple(widgets_from_values(values, self))
-        if self.tabulate and isinstance(values, (list, tuple, set, frozenset, dict)):
-            # let's make a tabulated view
-            tabs = QTabWidget()
-            for idx, (elem, tabname) in enumerate(
-                zip_longest(values, self.tab_names), start=1
-            ):
-                layout = QVBoxLayout()
-                for item in widgets_from_values(elem, tabs):
-                    layout.addWidget(item)
-                frame = QFrame(parent=tabs)
-                frame.setLayout(layout)
-                tabs.addTab(frame, tabname or f"tab {idx}")
-            layout = QVBoxLayout()
-            layout.addWidget(tabs)
-            self.setLayout(layout)
-        else:
+        tabbed = (
+            self.tabulate
+            and isinstance(values, (list, tuple, set, frozenset, dict))
+            and not is_long_list(values)  # one tab per row would not scale
+            and not is_table(values)
+        )
+        entries = list(values) if tabbed or isinstance(values, tuple) else [values]
+        for index, value in enumerate(entries):
+            self.set_entry(index, value, tabbed)
+        self.truncate(len(entries))
+
+    def set_entry(self, index: int, value: object, tabbed: bool):
+        """Show given value as the index-th entry, in a tab if tabbed
+
+        There must be at least index entries already.
+        In a tab not currently shown, the value is shown when the tab is.
+
+        """
+        self._remove_error()
+        if tabbed != (self.tabs is not None):  # entries must be moved: restart
+            self.truncate(0)
+            self._set_tabbed(tabbed)
+        if index < len(self.entries):
+            self.values[index] = value
+            self.stale.add(index)
+        else:  # new entry, empty until shown
+            container = QFrame(parent=self if self.tabs is None else self.tabs)
             layout = QVBoxLayout()
-            for wid in widgets_from_values(values, self):
-                layout.addWidget(wid)
-            self.setLayout(layout)
+            if not tabbed:
+                layout.setContentsMargins(0, 0, 0, 0)
+            container.setLayout(layout)
+            self.entries.append((None, container, []))
+            self.values.append(value)
+            self.stale.add(index)
+            if self.tabs is not None:  # may show the tab, if it is the first one
+                self.tabs.addTab(container, self._tab_name(index))
+            else:
+                self.layout().addWidget(container)
+        if self.tabs is None or index == self.tabs.currentIndex():
+            self._refresh(index)
+
+    def _refresh(self, index: int):
+        "Make the widgets of given entry show its value, if not already the case"
+        if index in self.stale:
+            self.stale.discard(index)
+            value = self.values[index]
+            shape = shape_of_value(value)
+            old_shape, container, leaves = self.entries[index]
+            if shape is not None and shape == old_shape:
+                for widget, leaf in zip(leaves, leaf_values(value)):
+                    update_widget(widget, leaf, self.array_display)
+            else:
+                leaves = []
+                clear_widgets(container.layout())
+                for wid in widgets_from_values(
+                    value, container, leaves, self.array_display
+                ):
+                    container.layout().addWidget(wid)
+                self.entries[index] = shape, container, leaves
+        if self.tabs is not None:
+            self._viewed(index)
+
+    def _viewed(self, index: int):
+        "Mark given tab as the most recently viewed, and release the oldest ones"
+        self.viewed.pop(index, None)
+        self.viewed[index] = image_bytes(self.values[index])
+        hidden = sum(self.viewed.values()) - self.viewed[index]
+        while hidden > self.max_tab_bytes:
+            oldest, size = self.viewed.popitem(last=False)
+            hidden -= size
+            _, container, _ = self.entries[oldest]
+            clear_widgets(container.layout())
+            self.entries[oldest] = None, container, []
+            self.stale.add(oldest)
+
+    def _on_tab_shown(self, index: int):
+        if 0 <= index < len(self.entries):
+            self._refresh(index)
+
+    def truncate(self, nb_entries: int):
+        "Remove the entries after the nb_entries first ones"
+        while len(self.entries) > nb_entries:
+            _, container, _ = self.entries.pop()
+            self.values.pop()
+            self.stale.discard(len(self.entries))
+            self.viewed.pop(len(self.entries), None)
+            if self.tabs is not None:
+                self.tabs.removeTab(len(self.entries))
+            container.setParent(None)
+            container.deleteLater()
+
+    def show_text(self, text: str):
+        "Show given text in a TextViewer, to which text can then be appended"
+        self.show_values("")  # a single entry
+        _, container, _ = self.entries[0]
+        clear_widgets(container.layout())
+        viewer = TextViewer(text, parent=container)
+        container.layout().addWidget(viewer)
+        self.entries[0] = TextViewer, container, [viewer]
+        self.values[0] = None  # the text is only kept by the viewer
+
+    def append_text(self, text: str):
+        "Add given text after the one shown by show_text"
+        if len(self.entries) == 1 and self.entries[0][0] is TextViewer:
+            self.entries[0][2][0].append_text(text)
+        else:  # the view shows something else
+            self.show_text(text)
+
+    def _tab_name(self, index: int) -> str:
+        if index < len(self.tab_names) and self.tab_names[index]:
+            return self.tab_names[index]
+        return f"tab {index + 1}"
+
+    def _set_tabbed(self, tabbed: bool):
+        if tabbed:
+            self.tabs = QTabWidget()
+            self.tabs.currentChanged.connect(self._on_tab_shown)
+            self.layout().addWidget(self.tabs)
+        elif self.tabs is not None:
+            self.tabs.setParent(None)
+            self.tabs.deleteLater()
+            self.tabs = None
 
+    def show_error(self, error: Exception):
+        "Show the traceback of given exception, instead of the entries"
+        self.truncate(0)
+        self._set_tabbed(False)
+        self._remove_error()
+        text = "".join(
+            traceback.format_exception(type(error), error, error.__traceback__)
+        )
+        self.error_label = QLabel(text, self)
+        self.error_label.setStyleSheet("color: red")
+        self.error_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.layout().addWidget(self.error_label)
+
+    def _remove_error(self):
+        if self.error_label is not None:
+            self.error_label.setParent(None)
+            self.error_label.deleteLater()
+            self.error_label = None
+
+
+def widgets_from_values(
+    obj: object, parent=None, leaves: list = None, array_display: dict = None
+) -> [QWidget]:
+    """Yield the widgets showing given value
 
-def widgets_from_values(obj: object, parent=None) -> [QWidget]:
-    if isinstance(obj, tuple):
+    If given, leaves is filled with the widgets showing the leaf values,
+    in the order of leaf_values(obj).
+    Numpy arrays are shown as images, according to the array_display options
+    of arrays.to_pixels. Lists of more than LONG_LIST_LENGTH values are shown
+    in a single ListViewer. DataFrames, structured arrays and lists of dicts
+    are shown in a TableViewer, strings of more than LONG_TEXT_LENGTH characters
+    in a TextViewer.
+
+    """
+    if is_table(obj):
+        widget = TableViewer(obj, parent=parent)
+        if leaves is not None:
+            leaves.append(widget)
+        yield widget
+    elif isinstance(obj, tuple):
         # a list of widgets to print in different tabs
         for elem in obj:
-            yield from widgets_from_values(elem, parent)
-    elif isinstance(obj, list):
+            yield from widgets_from_values(elem, parent, leaves, array_display)
+    elif isinstance(obj, list) and not is_long_list(obj):
         # just a list of objects to print vertically
         frame = QFrame(parent=parent)  # will contain everything
         layout = QVBoxLayout()
         for elem in obj:
             h_layout = QHBoxLayout()
-            for wid in widgets_from_values(elem, frame):
+            for wid in widgets_from_values(elem, frame, leaves, array_display):
                 h_layout.addWidget(wid)
             layout.addLayout(h_layout)
         frame.setLayout(layout)
         yield frame
+    else:
+        if is_long_text(obj):
+            widget = TextViewer(obj, parent=parent)
+        elif isinstance(obj, str):
+            widget = QLabel(obj, parent)
+        elif Image and isinstance(obj, Image.Image):
+            widget = ImageViewer(obj, parent=parent)
+        elif is_array(obj):
+            widget = ImageViewer(to_pixels(obj, **(array_display or {})), parent=parent)
+        elif is_long_list(obj):
+            widget = ListViewer(obj, array_display, parent=parent)
+        else:
+            raise NotImplementedError(
+                "Output '{}' of type '{}' is currently non implemented".format(
+                    obj, type(obj)
+                )
+            )
+        if leaves is not None:
+            leaves.append(widget)
+        yield widget
+
+
+def shape_of_value(obj: object) -> object:
+    """Return a hashable description of the widgets showing given value
+
+    Two values of same shape can be shown by the same widgets.
+    None is returned for values that can't be shown.
+
+    """
+    if is_table(obj):  # whatever its rows
+        return TableViewer
+    elif is_long_list(obj):  # whatever its values
+        return ListViewer
+    elif isinstance(obj, (tuple, list)):
+        shapes = tuple(map(shape_of_value, obj))
+        return None if None in shapes else (type(obj), shapes)
     elif isinstance(obj, str):
-        yield QLabel(obj, parent)
+        return TextViewer if is_long_text(obj) else QLabel
+    elif (Image and isinstance(obj, Image.Image)) or is_array(obj):
+        return ImageViewer
+    return None
+
+
+def downscaled_value(obj: object, max_pixels: int = None) -> object:
+    """Return given value, with its images reduced to at most max_pixels pixels
+
+    max_pixels defaults to PREVIEW_MAX_PIXELS. Images are reduced
+    by an integer factor ; numpy arrays are reduced without copy.
+
+    """
+    max_pixels = max_pixels or PREVIEW_MAX_PIXELS
+    if is_long_list(obj) or is_table(obj):  # only thumbnails or text are shown
+        return obj
+    elif isinstance(obj, (tuple, list)):
+        return type(obj)(downscaled_value(elem, max_pixels) for elem in obj)
     elif Image and isinstance(obj, Image.Image):
-        yield ImageViewer(obj, parent=parent)
+        factor = math.ceil(math.sqrt(obj.width * obj.height / max_pixels))
+        if factor > 1:
+            if obj.mode in {"1", "P"}:  # can't be averaged
+                size = max(1, obj.width // factor), max(1, obj.height // factor)
+                return obj.resize(size, Image.NEAREST)
+            return obj.reduce(factor)
+    elif is_array(obj):
+        factor = math.ceil(math.sqrt(obj.shape[0] * obj.shape[1] / max_pixels))
+        if factor > 1:
+            return obj[::factor, ::factor]
+    return obj
+
+
+def image_bytes(obj: object) -> int:
+    "Return the estimated memory used to show the images of given value"
+    return sum(
+        sizeof_output(leaf)
+        for leaf in leaf_values(obj)
+        if (Image and isinstance(leaf, Image.Image)) or is_array(leaf)
+    )
+
+
+def is_long_text(obj: object) -> bool:
+    "True if given value must be shown in a TextViewer"
+    return isinstance(obj, str) and len(obj) > LONG_TEXT_LENGTH
+
+
+def lines_text(lines: object) -> object:
+    """Return the text made of given lines, ending or not with a newline
+
+    A string is a single line ; a value that is not iterable is returned as is.
+
+    """
+    if isinstance(lines, str):
+        return lines
+    try:
+        lines = iter(lines)
+    except TypeError:
+        return lines
+    return "\n".join(_without_newline(str(line)) for line in lines)
+
+
+def _without_newline(line: str) -> str:
+    return line[:-1] if line.endswith("\n") else line
+
+
+def is_long_list(obj: object) -> bool:
+    "True if given value must be shown in a ListViewer"
+    return isinstance(obj, list) and len(obj) > LONG_LIST_LENGTH
+
+
+def leaf_values(obj: object) -> iter:
+    "Yield the values shown by the leaf widgets of widgets_from_values(obj)"
+    if isinstance(obj, (tuple, list)) and not (is_long_list(obj) or is_table(obj)):
+        for elem in obj:
+            yield from leaf_values(elem)
     else:
-        raise NotImplementedError(
-            "Output '{}' of type '{}' is currently non implemented".format(
-                obj, type(obj)
-            )
-        )
+        yield obj
+
+
+def update_widget(widget: QWidget, value: object, array_display: dict = None):
+    "Show given value in given leaf widget, of the same shape"
+    if isinstance(widget, QLabel):
+        widget.setText(value)
+    elif isinstance(widget, TextViewer):
+        widget.set_text(value)
+    elif isinstance(widget, ListViewer):
+        widget.set_values(value)
+    elif isinstance(widget, TableViewer):
+        widget.set_table(value)
+    elif isinstance(widget, ImageViewer):
+        if is_array(value):
+            value = to_pixels(value, **(array_display or {}))
+        widget.set_image(value)
+    else:
+        raise TypeError("Widget {} can't be updated".format(type(widget)))
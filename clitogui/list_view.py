@@ -0,0 +1,136 @@
+"""Implementation of a viewer of long lists of values
+
+Only the rows visible in the view are rendered: the values are given to Qt
+through a model, fetched by batches as the view is scrolled, and the images
+are reduced to thumbnails when their row is first shown.
+
+"""
+
+import math
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from PySide2.QtWidgets import *
+    from PySide2.QtCore import *
+    from PySide2.QtGui import *
+except ImportError:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtGui import *
+
+from .cache import ResultCache
+from .arrays import is_array, to_pixels
+from .image_viewer import to_qimage
+
+# number of rows added to the model each time the view needs more
+FETCH_BATCH = 1000
+# width and height of the thumbnails of the images
+THUMBNAIL_SIZE = 64
+# maximal number of thumbnails kept in memory
+THUMBNAIL_CACHE = 512
+
+
+class ListModel(QAbstractListModel):
+    """Model giving the values of a list to a view, row by row.
+
+    Strings are shown as is, images as thumbnails with their size,
+    and other values with their repr.
+
+    """
+
+    def __init__(self, values: list = (), array_display: dict = None, parent=None):
+        super().__init__(parent)
+        self.array_display = array_display or {}  # options of arrays.to_pixels
+        self.thumbnails = ResultCache(THUMBNAIL_CACHE)
+        self.values, self.nb_fetched = [], 0
+        self.set_values(values)
+
+    def set_values(self, values: list):
+        self.beginResetModel()
+        self.values = values
+        self.nb_fetched = min(len(values), FETCH_BATCH)
+        self.thumbnails.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.nb_fetched
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self.nb_fetched < len(self.values)
+
+    def fetchMore(self, parent=QModelIndex()):
+        nb_fetched = min(len(self.values), self.nb_fetched + FETCH_BATCH)
+        self.beginInsertRows(QModelIndex(), self.nb_fetched, nb_fetched - 1)
+        self.nb_fetched = nb_fetched
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.nb_fetched:
+            return None
+        value = self.values[index.row()]
+        image = (Image and isinstance(value, Image.Image)) or is_array(value)
+        if role == Qt.DisplayRole:
+            if isinstance(value, str):
+                return value
+            elif image:
+                width, height = _size_of(value)
+                return "{}×{}".format(width, height)
+            return repr(value)
+        elif role == Qt.DecorationRole and image:
+            return self.thumbnail(index.row())
+        elif role == Qt.ToolTipRole and isinstance(value, str):
+            return value
+        return None
+
+    def thumbnail(self, row: int) -> QPixmap:
+        "Return the thumbnail of the image at given row"
+        pixmap = self.thumbnails.get(row)
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(
+                to_qimage(thumbnail_of(self.values[row], self.array_display))
+            )
+            self.thumbnails.put(row, pixmap)
+        return pixmap
+
+
+class ListViewer(QListView):
+    "View of a long list of values, with a constant cost whatever its length"
+
+    def __init__(self, values: list = (), array_display: dict = None, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)  # no need to measure all rows
+        self.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setModel(ListModel(values, array_display, self))
+
+    def set_values(self, values: list):
+        self.model().set_values(values)
+
+
+def _size_of(image) -> (int, int):
+    if is_array(image):
+        return image.shape[1], image.shape[0]
+    return image.size
+
+
+def thumbnail_of(image, array_display: dict = None, size: int = THUMBNAIL_SIZE):
+    """Return given PIL image or numpy array, reduced to fit in a thumbnail
+    of size×size pixels
+
+    The result can be given to to_qimage.
+
+    """
+    width, height = _size_of(image)
+    factor = max(width, height) / size
+    if is_array(image):
+        step = max(1, math.floor(factor))
+        return to_pixels(image[::step, ::step], **(array_display or {}))
+    if factor > 1:
+        size = max(1, round(width / factor)), max(1, round(height / factor))
+        # reducing first by an integer factor avoids to resample all the pixels
+        image = image.resize(size, reducing_gap=2.0)
+    return image
@@ -0,0 +1,95 @@
+"""
+Model of the arguments extracted from a parser, independent of the parser library.
+
+Model objects are immutable once built: the GUI can reuse them
+on each parsing of its state without copying them.
+"""
+
+from types import MappingProxyType
+
+
+class _Spec:
+    "Base class of the model objects: immutable, with slots"
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} objects are immutable".format(type(self).__name__))
+
+    def _set(self, **attributes):
+        "Set given attributes ; to be used at initialization only"
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
+
+    def __getitem__(self, key: str):
+        "Allow access as a dict, like the model of previous versions"
+        return getattr(self, key)
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join(
+                "{}={!r}".format(attr, getattr(self, attr))
+                for attr in self.__slots__
+                if attr not in {"arguments", "by_name"}
+            ),
+        )
+
+
+class ArgumentSpec(_Spec):
+    """Description of one argument.
+
+    cli -- the option string (such as '--verbose'), or [] for a positional argument
+    name -- the dest of the argument, used as label ; not unique among subparsers
+    choices -- the valid values, or None
+    help -- the help text, or None
+    default -- the default value
+    type -- a python type, a user-defined function, or one of the strings
+        'file_path', 'directory_path', 'append_action', 'count_action',
+        'version_action'
+
+    Specs are compared and hashed by identity: the GUI keys its widgets and
+    values by ArgumentSpec, and two subparsers may have identical options.
+
+    """
+
+    __slots__ = ("cli", "name", "choices", "help", "default", "type")
+
+    def __init__(self, cli, name, choices, help, default, type):
+        # one call per attribute: built for each action, _set would be too slow
+        set_attribute = object.__setattr__
+        set_attribute(self, "cli", cli)
+        set_attribute(self, "name", name)
+        set_attribute(self, "choices", choices)
+        set_attribute(self, "help", help)
+        set_attribute(self, "default", default)
+        set_attribute(self, "type", type)
+
+
+class SubparserSpec(_Spec):
+    """Description of one subparser (or subcommand).
+
+    name -- the subcommand
+    list_actions -- tuple of its own ArgumentSpec
+    arguments -- tuple of the ArgumentSpec of the parent parser, then of its own
+        ones, ie all the arguments to handle when this subcommand is selected
+    by_name -- mapping from dest to ArgumentSpec, for all its arguments
+
+    """
+
+    __slots__ = ("name", "list_actions", "arguments", "by_name")
+
+    def __init__(self, name: str, list_actions: iter, parent_arguments: iter = ()):
+        list_actions = tuple(list_actions)
+        arguments = tuple(parent_arguments) + list_actions
+        self._set(
+            name=name,
+            list_actions=list_actions,
+            arguments=arguments,
+            by_name=index_by_name(arguments),
+        )
+
+
+def index_by_name(arguments: iter) -> MappingProxyType:
+    "Return a read-only mapping from dest to ArgumentSpec"
+    return MappingProxyType({arg.name: arg for arg in arguments})
@@ -0,0 +1,177 @@
+"""Timing of the phases of the dialogs, to diagnose slow previews.
+
+Each dialog has a Profiler, measuring the duration of its phases
+(parsing of the GUI state, call of the callback, rendering of the output…).
+Functions in HOOKS are called at the start and at the end of every phase.
+
+If the environment variable CLITOGUI_TRACE is set to a file path when clitogui
+is imported, all phases are also written to that file, in the Chrome trace
+format (to be opened with chrome://tracing or https://ui.perfetto.dev). The
+path may contain '{pid}', replaced by the process identifier.
+
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+import contextlib
+from collections import Counter, defaultdict
+
+
+TRACE_ENV = "CLITOGUI_TRACE"
+
+# functions (profiler, phase, duration) called when a phase starts
+#  (duration is then None) and ends (duration in seconds)
+HOOKS = []
+
+
+class _Local(threading.local):
+    "Profilers of the phases running in each thread, innermost last"
+
+    def __init__(self):
+        self.stack = []
+
+
+_local = _Local()
+
+
+class Profiler:
+    """Timing counters of named phases.
+
+    last -- duration in seconds of each phase during the current run,
+        in the order the phases started
+    total -- cumulated duration of each phase
+    count -- number of times each phase ended
+
+    """
+
+    def __init__(self):
+        self.last = {}
+        self.total = defaultdict(float)
+        self.count = Counter()
+        self._starts = {}  # phase -> start time, for the running phases
+
+    def new_run(self):
+        "Forget about the durations and the phases begun of the previous run"
+        self.last = {}
+        self._starts.clear()
+
+    def begin(self, name: str):
+        "Start given phase, ended by end() ; restart it if already running"
+        self._starts[name] = self._start(name)
+
+    def _start(self, name: str) -> float:
+        "Announce the start of given phase, and return its start time"
+        self.last.setdefault(name, 0.0)
+        start = time.perf_counter()
+        for hook in HOOKS:
+            hook(self, name, None)
+        return start
+
+    def end(self, name: str):
+        "End given phase ; do nothing if not running"
+        start = self._starts.pop(name, None)
+        if start is not None:
+            self.record(name, start, time.perf_counter() - start)
+
+    def record(self, name: str, start: float, duration: float):
+        "Count a phase started at given perf_counter time, having lasted duration"
+        self.last[name] = self.last.get(name, 0.0) + duration
+        self.total[name] += duration
+        self.count[name] += 1
+        write_trace_event(name, start, duration)
+        for hook in HOOKS:
+            hook(self, name, duration)
+
+    def phase(self, name: str):
+        "Context manager measuring given phase"
+        return _Phase(self, name)
+
+    def summary(self) -> str:
+        "Return a readable breakdown of the current run"
+        return " · ".join(
+            "{} {:.1f} ms".format(name, duration * 1000)
+            for name, duration in self.last.items()
+        )
+
+
+class _Phase:
+    "Context manager measuring a phase ; cheaper than a generator based one"
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        _local.stack.append(self.profiler)
+        # not in the _starts of the profiler: the phase outlives new runs
+        self.start = self.profiler._start(self.name)
+
+    def __exit__(self, *exc_info):
+        _local.stack.pop()
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+
+
+def phase(name: str):
+    """Context manager measuring given phase as part of the innermost running
+    phase of the thread, or only in the trace if there is none"""
+    stack = _local.stack
+    if stack:
+        return stack[-1].phase(name)
+    return _traced_phase(name)
+
+
+@contextlib.contextmanager
+def _traced_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        write_trace_event(name, start, time.perf_counter() - start)
+
+
+_trace_lock = threading.Lock()
+_trace_path = os.environ.get(TRACE_ENV)
+_trace_file = None
+
+
+def write_trace_event(name: str, start: float, duration: float):
+    "Write given phase to the trace file, if asked by the environment"
+    global _trace_file
+    if not _trace_path:
+        return
+    event = {
+        "name": name,
+        "cat": "clitogui",
+        "ph": "X",  # complete event
+        "ts": start * 1e6,
+        "dur": duration * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+    }
+    with _trace_lock:
+        if _trace_file is None:
+            _trace_file = open(_trace_path.replace("{pid}", str(os.getpid())), "w")
+            _trace_file.write("[\n")
+            atexit.register(_close_trace)
+        _trace_file.write(json.dumps(event) + ",\n")
+        _trace_file.flush()
+
+
+def _close_trace():
+    "Terminate the JSON array of the trace file"
+    global _trace_file
+    with _trace_lock:
+        if _trace_file is not None:
+            metadata = {
+                "name": "process_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "args": {"name": "clitogui"},
+            }
+            _trace_file.write(json.dumps(metadata) + "]\n")
+            _trace_file.close()
+            _trace_file = None
@@ -0,0 +1,559 @@
+"""Execution of the interactive callbacks away from the GUI thread.
+
+A runner receives jobs (a function and its arguments), runs them in the
+background and sends back, through Qt signals, the output of the newest one.
+Each submitted job carries a generation number: results of jobs superseded
+by a more recent submission are silently discarded.
+
+Two runners are available:
+    - ThreadRunner, running the jobs in a thread pool
+    - ProcessRunner, running the jobs in a worker process, for callbacks
+      holding the GIL ; their images are sent back through shared memory
+
+A job may be given a RunContext, through which it reports its progress
+and learns that it has been superseded.
+
+"""
+
+import io
+import os
+import time
+import pickle
+import signal
+import inspect
+import secrets
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from PySide2.QtCore import *
+except ImportError:
+    from PyQt5.QtCore import *
+    from PyQt5.QtCore import pyqtSignal as Signal
+
+
+def run_callback(
+    callback: callable, parsed_args, disk_cache=None, disk_key=None, consume=True
+):
+    """Return the output of callback for given parsed args
+
+    If a disk cache and a key are given, the output is looked for in
+    (and stored to) the disk cache.
+    Generators are fully consumed, unless consume is False: then a generator
+    yielding the same items is returned, and stored once exhausted.
+
+    """
+    if disk_key:
+        output = disk_cache.get(disk_key, run_callback)
+        if output is not run_callback:  # the function is the cache miss marker
+            return output
+    output = callback(parsed_args)
+    if inspect.isgenerator(output):
+        if not consume:
+            return _store_when_exhausted(output, disk_cache, disk_key)
+        output = tuple(output)
+    if disk_key:
+        disk_cache.put(disk_key, output)
+    return output
+
+
+def _store_when_exhausted(generator, disk_cache, disk_key):
+    items = []
+    for item in generator:
+        items.append(item)
+        yield item
+    if disk_key:
+        disk_cache.put(disk_key, tuple(items))
+
+
+# minimal number of seconds between two progress reports of a job
+PROGRESS_INTERVAL = 0.05
+# number of bytes of pixels copied at once into shared memory
+STRIP_BYTES = 2 ** 20
+
+
+class RunContext:
+    """Handle given to a running callback, to report its progress and stop early.
+
+    The callback may call progress(fraction, message) to report how much
+    of its work is done, and should return as soon as cancelled() is True:
+    its output will not be used.
+
+    """
+
+    def __init__(self, report: callable = None):
+        self._report = report  # function (fraction, message), or None
+        self._cancelled = threading.Event()
+        self._last_report = 0.0
+
+    def cancelled(self) -> bool:
+        "True if the output of the callback is no longer needed"
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def progress(self, fraction: float, message: str = ""):
+        "Report that given fraction (in [0;1]) of the work is done"
+        now = time.perf_counter()
+        if self._report is None or (
+            now - self._last_report < PROGRESS_INTERVAL and fraction < 1
+        ):
+            return  # reports faster than the screen refresh would be wasted
+        self._last_report = now
+        self._report(min(max(float(fraction), 0.0), 1.0), str(message))
+
+    def __reduce__(self):
+        # in a worker process, progress is sent back through the progress pipe ;
+        #  cancellation is done by terminating the worker
+        return _worker_context, ()
+
+
+_progress_pipe = None  # in the worker processes, where to send the progress
+
+
+def _init_worker(pipe, pid):
+    "Initializer of the worker processes: keep the pipe, and tell our pid"
+    global _progress_pipe
+    _progress_pipe = pipe
+    pid.value = os.getpid()
+
+
+def _worker_context() -> RunContext:
+    return RunContext(_report_to_parent if _progress_pipe else None)
+
+
+def _report_to_parent(fraction: float, message: str):
+    _progress_pipe.send((fraction, message))
+
+
+class Runner(QObject):
+    """Base class for the runners, handling the generations of jobs.
+
+    Signals:
+        - finished(object): emitted with the output of the newest job
+        - failed(object): emitted with the exception raised by the newest job
+        - yielded(object): if the newest job returns a generator (and the runner
+          supports it), emitted with each item as soon as it is produced ;
+          finished is then emitted with the tuple of all items
+        - progressed(float, str): emitted with the fraction of the work done
+          and a message, when the newest job reports its progress
+
+    timeout -- if given, number of seconds after which a running job is
+        discarded and reported as failed
+
+    The base class runs the jobs in the calling thread: its signals are
+    emitted before submit returns. Subclasses implement _start to run them
+    in the background, and may implement _cancel.
+
+    """
+
+    finished = Signal(object)
+    failed = Signal(object)
+    yielded = Signal(object)
+    progressed = Signal(float, str)
+    # internal signals, used to bring back results from the workers
+    _job_done = Signal(int, object)
+    _job_failed = Signal(int, object)
+    _job_yielded = Signal(int, object)
+    _job_progressed = Signal(int, float, str)
+
+    def __init__(self, parent=None, timeout: float = None):
+        super().__init__(parent)
+        self.generation = 0  # generation of the newest submitted job
+        self.running = False  # True while the newest job is not done
+        self.timeout = timeout
+        self.context = None  # RunContext of the newest job, if any
+        self._job_done.connect(self._on_job_done)
+        self._job_failed.connect(self._on_job_failed)
+        self._job_yielded.connect(self._on_job_yielded)
+        self._job_progressed.connect(self._on_job_progressed)
+
+    def new_context(self) -> RunContext:
+        """Return a RunContext reporting the progress of the next submitted job
+
+        It is cancelled as soon as the job is discarded.
+
+        """
+        generation = self.generation + 1  # the one given by the next submit
+        signal = self._job_progressed
+
+        def report(fraction: float, message: str):
+            try:
+                signal.emit(generation, fraction, message)
+            except RuntimeError:  # runner deleted with its dialog while running
+                pass
+
+        return RunContext(report)
+
+    def submit(self, func: callable, *args, context: RunContext = None) -> int:
+        """Run func(*args) in background, return the generation of the job
+
+        context -- the RunContext given to the job, if any, from new_context
+
+        """
+        self.discard()
+        self.context = context
+        generation = self.generation
+        self.running = True  # before the job may report its outcome
+        try:
+            self._start(generation, func, args)
+        except BaseException:
+            self.running = False
+            raise
+        if self.timeout:
+            QTimer.singleShot(
+                int(self.timeout * 1000), lambda: self._on_timeout(generation)
+            )
+        return generation
+
+    def discard(self):
+        "Forget about all submitted jobs ; their results will not be emitted"
+        self.generation += 1
+        if self.context is not None:
+            self.context.cancel()
+            self.context = None
+        if self.running:
+            self._cancel()
+        self.running = False
+
+    def shutdown(self):
+        "Discard all jobs, and release the workers"
+        self.discard()
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation
+
+    def _start(self, generation: int, func: callable, args: tuple):
+        "Start running func(*args) ; outcome must be sent through _job_* signals"
+        try:
+            output = func(*args)
+            if inspect.isgenerator(output):
+                output = tuple(output)
+        except Exception as err:
+            self._job_failed.emit(generation, err)
+        else:
+            self._job_done.emit(generation, output)
+
+    def _cancel(self):
+        "Called when the running job is superseded ; do nothing ; to be overriden"
+        pass
+
+    def _on_job_done(self, generation: int, output: object):
+        if self.is_current(generation):
+            self.running = False
+            self.finished.emit(output)
+
+    def _on_job_failed(self, generation: int, error: Exception):
+        if self.is_current(generation):
+            self.running = False
+            self.failed.emit(error)
+
+    def _on_job_yielded(self, generation: int, item: object):
+        if self.is_current(generation):
+            self.yielded.emit(item)
+
+    def _on_job_progressed(self, generation: int, fraction: float, message: str):
+        if self.is_current(generation) and self.running:
+            self.progressed.emit(fraction, message)
+
+    def _on_timeout(self, generation: int):
+        if self.is_current(generation) and self.running:
+            self.discard()
+            self.failed.emit(
+                TimeoutError("Callback still running after {}s".format(self.timeout))
+            )
+
+
+class ThreadRunner(Runner):
+    """Run jobs in a thread pool.
+
+    Threads can't be killed: a superseded job runs until its end,
+    but its output is ignored. Generators returned by jobs are consumed
+    in the thread, their items being emitted through the yielded signal.
+    A superseded generator is closed.
+
+    """
+
+    def __init__(self, parent=None, timeout: float = None):
+        super().__init__(parent, timeout)
+        self.pool = QThreadPool(self)
+
+    def _start(self, generation: int, func: callable, args: tuple):
+        self.pool.start(_Job(self, generation, func, args))
+
+    def _cancel(self):
+        self.pool.clear()  # jobs that did not start yet are just dropped
+
+
+class _Job(QRunnable):
+    "A single call to a function, reporting its outcome to given runner"
+
+    def __init__(self, runner: ThreadRunner, generation: int, func: callable, args):
+        super().__init__()
+        self.runner, self.generation, self.func, self.args = (
+            runner,
+            generation,
+            func,
+            args,
+        )
+
+    def run(self):
+        if not self.runner.is_current(self.generation):
+            return  # superseded before even starting
+        try:
+            output = self.func(*self.args)
+            if inspect.isgenerator(output):
+                items = []
+                for item in output:
+                    items.append(item)
+                    if not (
+                        self.runner.is_current(self.generation)
+                        and self._report("_job_yielded", item)
+                    ):
+                        output.close()
+                        return
+                output = tuple(items)
+        except Exception as err:
+            self._report("_job_failed", err)
+        else:
+            self._report("_job_done", output)
+
+    def _report(self, signal: str, value: object) -> bool:
+        "Emit given internal signal of the runner ; False if it no longer exists"
+        try:
+            getattr(self.runner, signal).emit(self.generation, value)
+        except RuntimeError:  # runner deleted with its dialog while running
+            return False
+        return True
+
+
+class ProcessRunner(Runner):
+    """Run jobs in a worker process.
+
+    The function and its arguments must be picklable. The output is pickled
+    back, except for PIL images, whose pixels are sent through shared memory.
+    The worker running a superseded job is terminated, and replaced ;
+    the shared memory blocks it created are unlinked.
+    A crashing worker is reported as a failure of its job.
+    The progress reported by the jobs is sent back through a pipe,
+    read by a thread of the GUI process.
+
+    """
+
+    def __init__(self, parent=None, timeout: float = None):
+        super().__init__(parent, timeout)
+        self.executor = None
+        self.future = None
+        self._progress_sender = None  # our end of the pipe given to the worker
+        self._worker_pid = None  # shared value, set by the worker once started
+        self._started = None  # generation of the last started job
+        # names of the shared memory blocks of a job start with this prefix,
+        #  followed by its generation
+        self._block_prefix = "clitogui_" + secrets.token_hex(4)
+
+    def _start(self, generation: int, func: callable, args: tuple):
+        if self.executor is None:
+            self._new_executor()
+        self._started = generation
+        prefix = "{}_{}".format(self._block_prefix, generation)
+        try:
+            self.future = self.executor.submit(run_in_process, func, args, prefix)
+        except BrokenProcessPool:  # previous worker crashed: use a new one
+            self._close_executor()
+            self._new_executor()
+            self.future = self.executor.submit(run_in_process, func, args, prefix)
+        self.future.add_done_callback(
+            lambda future: self._on_future_done(generation, prefix, future)
+        )
+
+    def _new_executor(self):
+        # the workers inherit our resource tracker, which then learns that
+        #  we unlinked the blocks they created, instead of starting their own
+        resource_tracker.ensure_running()
+        receiver, self._progress_sender = multiprocessing.Pipe(duplex=False)
+        self._worker_pid = multiprocessing.Value("q", 0, lock=False)
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_init_worker,
+            initargs=(self._progress_sender, self._worker_pid),
+        )
+        threading.Thread(
+            target=self._read_progress, args=(receiver,), daemon=True
+        ).start()
+
+    def _close_executor(self):
+        "Release the executor, once its worker is terminated or shut down"
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        if self._progress_sender is not None:
+            # the reader stops once the worker has closed its end too
+            self._progress_sender.close()
+            self._progress_sender = None
+
+    def _read_progress(self, receiver):
+        "Run in a thread: emit the progress sent by the worker, until it exits"
+        try:
+            while True:
+                fraction, message = receiver.recv()
+                self._job_progressed.emit(self._started, fraction, message)
+        except (EOFError, OSError, RuntimeError, pickle.UnpicklingError):
+            pass  # worker is gone, or runner deleted with its dialog
+        finally:
+            receiver.close()
+
+    def _on_future_done(self, generation: int, prefix: str, future):
+        "Called in a thread of the executor when a job is done"
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self._job_done.emit(generation, future.result())
+        else:  # maybe terminated, or crashed, while creating shared memory
+            unlink_blocks(prefix)
+            self._job_failed.emit(generation, error)
+
+    def _on_job_done(self, generation: int, payload: bytes):
+        # always load it, so that the shared memory blocks are released
+        try:
+            output = load_output(payload)
+        except Exception as err:
+            self._on_job_failed(generation, err)
+        else:
+            super()._on_job_done(generation, output)
+
+    def _cancel(self):
+        if self.future is not None and not self.future.cancel():
+            self._terminate_worker()  # already running
+        self.future = None
+
+    def shutdown(self):
+        super().shutdown()
+        self._close_executor()
+
+    def _terminate_worker(self):
+        "Kill the worker ; the executor then fails the job, and is replaced"
+        if self.executor is None:
+            return
+        pid = self._worker_pid.value
+        if pid:  # the worker started, since it runs the job
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:  # already gone
+                pass
+        self._close_executor()
+
+
+def run_in_process(func: callable, args: tuple, block_prefix: str = None) -> bytes:
+    """Executed in a worker process ; return the pickled output of func(*args)
+
+    The pickled output must be given to load_output in the receiving process,
+    so that the shared memory holding its images is released.
+    If block_prefix is given, the shared memory blocks are named by it
+    and their index, so that unlink_blocks can release them if the output
+    is never received.
+
+    """
+    output = func(*args)
+    buffer = io.BytesIO()
+    _SharedMemoryPickler(buffer, block_prefix).dump(output)
+    return buffer.getvalue()
+
+
+def unlink_blocks(block_prefix: str):
+    "Release the shared memory blocks created by run_in_process with given prefix"
+    for index in itertools.count():
+        try:
+            block = shared_memory.SharedMemory(name="{}_{}".format(block_prefix, index))
+        except FileNotFoundError:  # blocks are created in order
+            return
+        block.close()
+        block.unlink()
+
+
+def load_output(payload: bytes) -> object:
+    "Return the output pickled by run_in_process, its images in shared memory"
+    return _SharedMemoryUnpickler(io.BytesIO(payload)).load()
+
+
+class _SharedMemoryPickler(pickle.Pickler):
+    """Pickler copying pixels of PIL images into shared memory
+
+    The pixels are written by strips of rows: they are never all copied
+    in the memory of the worker.
+
+    """
+
+    def __init__(self, file, block_prefix: str = None):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.block_prefix = block_prefix
+        self.nb_blocks = 0
+
+    def persistent_id(self, obj):
+        if not (Image and isinstance(obj, Image.Image)):
+            return None  # pickle it as usual
+        width, height = obj.size
+        if not width or not height:  # no shared memory block can hold it
+            return None
+        row_size = len(obj.crop((0, 0, width, 1)).tobytes())
+        name = None
+        if self.block_prefix is not None:
+            name = "{}_{}".format(self.block_prefix, self.nb_blocks)
+        block = shared_memory.SharedMemory(name, create=True, size=row_size * height)
+        self.nb_blocks += 1
+        try:
+            rows = max(1, STRIP_BYTES // row_size)
+            for top in range(0, height, rows):
+                bottom = min(top + rows, height)
+                strip = obj if rows >= height else obj.crop((0, top, width, bottom))
+                data = strip.tobytes()
+                block.buf[top * row_size : top * row_size + len(data)] = data
+        finally:
+            block.close()  # will be unlinked by the receiver
+        palette = obj.getpalette() if obj.mode == "P" else None
+        return "image", block.name, obj.mode, obj.size, palette
+
+
+class _SharedBlock(shared_memory.SharedMemory):
+    "Shared memory block that may be garbage collected while an image uses it"
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:  # still used, at interpreter exit
+            pass
+
+
+class _SharedMemoryUnpickler(pickle.Unpickler):
+    "Unpickler building the PIL images from shared memory blocks"
+
+    def persistent_load(self, pid):
+        kind, name, mode, size, palette = pid
+        if kind != "image" or Image is None:
+            raise pickle.UnpicklingError("Unsupported persistent object: " + kind)
+        block = _SharedBlock(name=name)
+        block.unlink()  # memory is released once nothing uses it anymore
+        # the image will share the memory for modes Pillow maps directly
+        image = Image.frombuffer(mode, size, block.buf, "raw", mode, 0, 1)
+        if image.readonly or mode == "RGB":
+            # keep the block alive as long as the image ; being set after
+            #  the image data, it will also be released after it.
+            image._shared_memory = block
+            # raw pixels, to be shown without copy ; a view of the block
+            #  memory, so that it stays valid as long as it is used
+            image._raw_buffer = block.buf[:]
+        else:  # pixels were copied
+            block.close()
+        if palette is not None:
+            image.putpalette(palette)
+        return image
@@ -0,0 +1,388 @@
+"""Parameter sweeps: the callback run over many combinations of option values.
+
+The user gives a list or range of values for some options of the
+InteractiveInterface ; the callback is run for each combination of them
+on a bounded pool of workers, and the outputs are shown as a grid of
+thumbnails, as soon as they are computed.
+
+"""
+
+import math
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    from PySide2.QtWidgets import *
+    from PySide2.QtCore import *
+    from PySide2.QtGui import *
+except ImportError:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import pyqtSignal as Signal
+
+from .arrays import is_array
+from .list_view import thumbnail_of
+from .image_viewer import to_qimage
+from .runner import ProcessRunner, RunContext, run_in_process, load_output
+
+# width and height of the thumbnails of the outputs
+SWEEP_THUMBNAIL_SIZE = 160
+# maximal number of thumbnails on a row of the grid
+SWEEP_MAX_COLUMNS = 8
+# number of characters of the text outputs shown in the grid
+SWEEP_TEXT_LENGTH = 200
+
+TRUE_WORDS = {"1", "true", "yes", "on"}
+FALSE_WORDS = {"0", "false", "no", "off"}
+
+_MISSING = object()  # marker of a cache miss
+
+
+def is_sweepable(arg) -> bool:
+    "True if values of given ArgumentSpec can be given as a list or a range"
+    return arg.choices is not None or arg.type in {int, bool, "count_action"}
+
+
+def parse_sweep_values(text: str, arg) -> list:
+    """Return the values of given ArgumentSpec described by given text
+
+    Values are separated by commas. Integer values may be given as ranges,
+    "start:stop" or "start:stop:step", stop being included ;
+    "*" means all the choices, or both booleans.
+    Values are given as held by the option widget: int, bool or str.
+    Raise ValueError if the text is invalid.
+
+    """
+    items = [item.strip() for item in text.split(",") if item.strip()]
+    if arg.choices is not None:
+        choices = tuple(map(str, arg.choices))
+        if items == ["*"]:
+            return list(choices)
+        for item in items:
+            if item not in choices:
+                raise ValueError(
+                    "{}: {} is not one of {}".format(arg.name, repr(item), choices)
+                )
+        return items
+    elif arg.type is bool:
+        if items == ["*"]:
+            return [False, True]
+        values = []
+        for item in items:
+            if item.lower() not in TRUE_WORDS | FALSE_WORDS:
+                raise ValueError("{}: {} is not a boolean".format(arg.name, item))
+            values.append(item.lower() in TRUE_WORDS)
+        return values
+    values = []
+    for item in items:
+        bounds = item.split(":")
+        try:
+            if len(bounds) == 1:
+                values.append(int(item))
+                continue
+            elif len(bounds) not in {2, 3}:
+                raise ValueError
+            start, stop, step = map(int, bounds + ["1"] * (3 - len(bounds)))
+        except ValueError:
+            raise ValueError("{}: {} is not an integer or range".format(arg.name, item))
+        if step == 0:
+            raise ValueError("{}: null step in {}".format(arg.name, item))
+        values.extend(range(start, stop + (1 if step > 0 else -1), step))
+    return values
+
+
+def combinations(values: dict) -> [dict]:
+    "Return the cartesian product of given option values, as {option: value} dicts"
+    return [dict(zip(values, combo)) for combo in itertools.product(*values.values())]
+
+
+class SweepRunner(QObject):
+    """Run jobs on a bounded pool of workers, reporting each outcome.
+
+    Signals:
+        - done(int, object): emitted with the index of a job and its output
+        - failed(int, object): emitted with the index of a job and its exception
+
+    workers -- maximal number of jobs running at once
+    processes -- if True, run the jobs in worker processes
+
+    """
+
+    done = Signal(int, object)
+    failed = Signal(int, object)
+    # internal signals, used to bring back results from the workers
+    _job_done = Signal(int, int, object)
+    _job_failed = Signal(int, int, object)
+
+    def __init__(self, workers: int, processes: bool = False, parent=None):
+        super().__init__(parent)
+        self.workers, self.processes = max(1, int(workers)), processes
+        self.generation = 0
+        self.executor = None
+        self._job_done.connect(self._on_job_done)
+        self._job_failed.connect(self._on_job_failed)
+
+    def start(self, jobs: [(callable, tuple)]):
+        "Run each func(*args) of given jobs, stopping the previous ones"
+        self.stop()
+        pool = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+        self.executor = pool(max_workers=self.workers)
+        generation = self.generation
+        for index, (func, args) in enumerate(jobs):
+            if self.processes:
+                future = self.executor.submit(run_in_process, func, args)
+            else:
+                future = self.executor.submit(func, *args)
+            future.add_done_callback(
+                lambda future, index=index: self._report(generation, index, future)
+            )
+
+    def stop(self):
+        "Forget about the running jobs, and drop the ones not started yet"
+        self.generation += 1
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _report(self, generation: int, index: int, future):
+        "Called in a thread of the executor when a job is done"
+        if future.cancelled():
+            return
+        try:
+            error = future.exception()
+            if error is None:
+                self._job_done.emit(generation, index, future.result())
+            else:
+                self._job_failed.emit(generation, index, error)
+        except RuntimeError:  # runner deleted with its dialog while running
+            pass
+
+    def _on_job_done(self, generation: int, index: int, output: object):
+        if self.processes:  # always load it, to release the shared memory
+            try:
+                output = load_output(output)
+            except Exception as err:
+                self._on_job_failed(generation, index, err)
+                return
+        if generation == self.generation:
+            self.done.emit(index, output)
+
+    def _on_job_failed(self, generation: int, index: int, error: Exception):
+        if generation == self.generation:
+            self.failed.emit(index, error)
+
+
+class SweepDialog(QDialog):
+    """Window running a sweep of the callback of an InteractiveInterface.
+
+    Each option accepting a list of values gets a field, where the user
+    writes the values to try. The outputs are shown in a grid, each one
+    labelled by its values of the swept options.
+    The callback runs in worker processes if the interface uses
+    the "process" executor, in worker threads otherwise.
+
+    workers -- maximal number of callbacks running at once ;
+        defaults to the number of processors
+
+    """
+
+    def __init__(self, interface, workers: int = None):
+        super().__init__(interface)
+        self.setWindowTitle("Sweep")
+        self.interface = interface
+        processes = isinstance(interface.runner, ProcessRunner)
+        self.runner = SweepRunner(
+            workers or QThread.idealThreadCount(), processes, parent=self
+        )
+        self.runner.done.connect(self._on_done)
+        self.runner.failed.connect(self._on_failed)
+        self.context = None  # RunContext given to the callbacks, if asked
+        self.jobs = []  # (combination, cache key) of each combination
+        self.cells = []  # QLabel showing the output of each combination
+        self.shown = {}  # cache key -> pixmap or text shown for an output
+        self._indexes = []  # index of the combination of each running job
+        self.nb_done, self.nb_failed, self.nb_cached = 0, 0, 0
+        self.start_time = None
+        self.fields = {}  # ArgumentSpec -> QLineEdit
+        form = QFormLayout()
+        for arg in interface._current_arguments():
+            if is_sweepable(arg) and arg.type != "version_action":
+                field = QLineEdit(self)
+                field.setPlaceholderText(_placeholder(arg))
+                self.fields[arg] = field
+                form.addRow(arg.name, field)
+        run_button = QPushButton("Run sweep", self)
+        run_button.clicked.connect(self.run)
+        stop_button = QPushButton("Stop", self)
+        stop_button.clicked.connect(self.stop)
+        self.status = QLabel(self)
+        buttons = QHBoxLayout()
+        buttons.addWidget(run_button)
+        buttons.addWidget(stop_button)
+        buttons.addWidget(self.status, 1)
+        self.grid = QGridLayout()
+        grid_widget = QWidget()
+        grid_widget.setLayout(self.grid)
+        scroll = QScrollArea(self)
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(grid_widget)
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addLayout(buttons)
+        layout.addWidget(scroll, 1)
+        self.setLayout(layout)
+        self.resize(900, 700)
+
+    def run(self):
+        "Start the sweep over the values given in the fields"
+        try:
+            values = {
+                arg: parse_sweep_values(field.text(), arg)
+                for arg, field in self.fields.items()
+                if field.text().strip()
+            }
+        except ValueError as err:
+            self.status.setText(str(err))
+            return
+        values = {arg: options for arg, options in values.items() if options}
+        if not values:
+            self.status.setText("Give the values of at least one option")
+            return
+        self.stop()
+        self._clear_grid()
+        columns = min(len(list(values.values())[-1]), SWEEP_MAX_COLUMNS)
+        self.context = RunContext() if self.interface.progress else None
+        jobs = self.interface._sweep_jobs(combinations(values), self.context)
+        self.jobs = [(combination, key) for combination, key, _ in jobs]
+        self.nb_done, self.nb_failed, self.nb_cached = 0, 0, 0
+        self.start_time = time.perf_counter()
+        to_run = []  # (index, job) of the combinations not in cache
+        for index, (combination, key, job) in enumerate(jobs):
+            title = QLabel(
+                ", ".join(
+                    "{}={}".format(arg.name, value)
+                    for arg, value in combination.items()
+                ),
+                self,
+            )
+            cell = QLabel("…", self)
+            cell.setAlignment(Qt.AlignCenter)
+            cell.setFixedSize(SWEEP_THUMBNAIL_SIZE, SWEEP_THUMBNAIL_SIZE)
+            row, column = divmod(index, columns)
+            self.grid.addWidget(title, 2 * row, column)
+            self.grid.addWidget(cell, 2 * row + 1, column)
+            self.cells.append(cell)
+            output = _MISSING
+            if key not in self.shown:
+                output = self.interface.cache.get(key, _MISSING)
+            if key not in self.shown and output is _MISSING:
+                to_run.append((index, job))
+            else:
+                self.nb_cached += 1
+                self._show(index, output)
+        self._indexes = [index for index, _ in to_run]
+        self.runner.start([job for _, job in to_run])
+        self._show_status()
+
+    def stop(self):
+        "Stop the running sweep ; outputs already computed stay shown"
+        self.runner.stop()
+        if self.context is not None:
+            self.context.cancel()
+        self._show_status()
+
+    def done(self, result: int):
+        self.stop()  # don't compute for a closed window
+        super().done(result)
+
+    def _on_done(self, run_index: int, output: object):
+        index = self._indexes[run_index]
+        self.interface.cache.put(self.jobs[index][1], output)
+        self._show(index, output)
+
+    def _on_failed(self, run_index: int, error: Exception):
+        index = self._indexes[run_index]
+        self.nb_failed += 1
+        self.cells[index].setText("{}:\n{}".format(type(error).__name__, error))
+        self.cells[index].setStyleSheet("color: red")
+        self.cells[index].setWordWrap(True)
+        self._show_status()
+
+    def _show(self, index: int, output: object = _MISSING):
+        "Show given output in the index-th cell ; if missing, the one already shown"
+        self.nb_done += 1
+        key = self.jobs[index][1]
+        if output is not _MISSING:
+            self.shown[key] = self._thumbnail(output)
+        cell = self.cells[index]
+        if isinstance(self.shown[key], QPixmap):
+            cell.setPixmap(self.shown[key])
+        else:
+            cell.setText(self.shown[key])
+            cell.setWordWrap(True)
+        self._show_status()
+
+    def _thumbnail(self, output: object) -> QPixmap or str:
+        "Return the pixmap of the first image of given output, or its text"
+        image = first_image(output)
+        if image is not None:
+            image = thumbnail_of(
+                image, self.interface.array_display, SWEEP_THUMBNAIL_SIZE
+            )
+            return QPixmap.fromImage(to_qimage(image))
+        text = output if isinstance(output, str) else repr(output)
+        return text[:SWEEP_TEXT_LENGTH]
+
+    def _show_status(self):
+        "Show the number of combinations done, and the throughput"
+        if self.start_time is None:
+            return
+        total = len(self.jobs)
+        computed = self.nb_done - self.nb_cached + self.nb_failed
+        elapsed = time.perf_counter() - self.start_time
+        parts = ["{}/{} done".format(self.nb_done + self.nb_failed, total)]
+        if computed and elapsed > 0:
+            throughput = computed / elapsed
+            parts.append("{:.1f} runs/s".format(throughput))
+            remaining = total - self.nb_done - self.nb_failed
+            if remaining:
+                parts.append("{} s left".format(math.ceil(remaining / throughput)))
+        if self.nb_cached:
+            parts.append("{} cached".format(self.nb_cached))
+        if self.nb_failed:
+            parts.append("{} failed".format(self.nb_failed))
+        self.status.setText(" · ".join(parts))
+
+    def _clear_grid(self):
+        while self.grid.count():
+            widget = self.grid.takeAt(0).widget()
+            widget.setParent(None)
+            widget.deleteLater()
+        self.cells = []
+
+
+def _placeholder(arg) -> str:
+    if arg.choices is not None:
+        return "values among {}, or *".format(", ".join(map(str, arg.choices)))
+    elif arg.type is bool:
+        return "true, false, or *"
+    return "values or ranges, such as 1, 2, 5 or 10:100:10"
+
+
+def first_image(obj: object) -> object:
+    "Return the first PIL image or numpy array found in given output, or None"
+    if (Image and isinstance(obj, Image.Image)) or is_array(obj):
+        return obj
+    elif isinstance(obj, (tuple, list)):
+        for elem in obj[:SWEEP_MAX_COLUMNS]:  # don't walk through long lists
+            image = first_image(elem)
+            if image is not None:
+                return image
+    return None
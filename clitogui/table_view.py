@@ -0,0 +1,193 @@
+"""Implementation of a viewer of tables
+
+Handled tables are pandas DataFrames, numpy structured arrays
+and lists of dicts. Cells are read from the columns when shown,
+and rows are given to Qt by batches as the view is scrolled.
+Sorting only computes the order of the rows, without copying them.
+
+"""
+
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from PySide2.QtWidgets import *
+    from PySide2.QtCore import *
+    from PySide2.QtGui import *
+except ImportError:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtGui import *
+
+# number of rows added to the model each time the view needs more
+FETCH_BATCH = 10000
+
+
+def is_table(obj: object) -> bool:
+    "True if given value can be shown by a TableViewer"
+    if hasattr(obj, "columns") and hasattr(obj, "iloc"):  # pandas DataFrame
+        return True
+    elif numpy is not None and isinstance(obj, numpy.ndarray):
+        return obj.dtype.names is not None and obj.ndim == 1
+    # all rows are checked, at C speed: one of them may not be a dict
+    return (
+        isinstance(obj, list)
+        and bool(obj)
+        and all(map(isinstance, obj, itertools.repeat(dict)))
+    )
+
+
+class Columns:
+    """Columnar access to a table.
+
+    names -- the names of the columns
+    nb_rows -- the number of rows
+    labels -- the label of each row, or None to number them
+    records -- True if the table is a sequence of dicts, possibly empty
+
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.labels = None
+        self.records = False
+        self.nb_rows = len(table)
+        if hasattr(table, "iloc"):  # pandas DataFrame
+            self.names = list(map(str, table.columns))
+            self.labels = table.index
+            self._columns = [None] * len(self.names)  # numpy arrays, when needed
+        elif getattr(getattr(table, "dtype", None), "names", None) is not None:
+            self.names = list(table.dtype.names)  # structured array
+        else:  # sequence of dicts
+            self.records = True
+            names = {}  # ordered set of the keys of all rows
+            for record in table:
+                names.update(dict.fromkeys(record))
+            self.names = list(names)
+
+    def column(self, index: int):
+        "Return the values of given column, as a sequence indexed by row"
+        if hasattr(self.table, "iloc"):
+            if self._columns[index] is None:  # a view of the data if possible
+                self._columns[index] = self.table.iloc[:, index].to_numpy()
+            return self._columns[index]
+        elif self.records:
+            name = self.names[index]
+            return [record.get(name) for record in self.table]
+        return self.table[self.names[index]]
+
+    def cell(self, row: int, column: int) -> object:
+        if self.records:
+            return self.table[row].get(self.names[column])
+        return self.column(column)[row]
+
+    def label(self, row: int) -> str:
+        return str(row if self.labels is None else self.labels[row])
+
+
+class TableModel(QAbstractTableModel):
+    """Model giving the cells of a table to a view.
+
+    Rows can be sorted by any column: the order of the rows is then
+    kept as an array of row indexes.
+
+    """
+
+    def __init__(self, table=(), parent=None):
+        super().__init__(parent)
+        self.columns = None
+        self.order = None  # rows in display order, or None for the table order
+        self.nb_fetched = 0
+        self.set_table(table)
+
+    def set_table(self, table):
+        self.beginResetModel()
+        self.columns = Columns(table)
+        self.order = None
+        self.nb_fetched = min(self.columns.nb_rows, FETCH_BATCH)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.nb_fetched
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns.names)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self.nb_fetched < self.columns.nb_rows
+
+    def fetchMore(self, parent=QModelIndex()):
+        nb_fetched = min(self.columns.nb_rows, self.nb_fetched + FETCH_BATCH)
+        self.beginInsertRows(QModelIndex(), self.nb_fetched, nb_fetched - 1)
+        self.nb_fetched = nb_fetched
+        self.endInsertRows()
+
+    def _row(self, row: int) -> int:
+        "Return the row in the table of given row in the view"
+        return row if self.order is None else int(self.order[row])
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        value = self.columns.cell(self._row(index.row()), index.column())
+        return "" if value is None else str(value)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns.names[section]
+        return self.columns.label(self._row(section))
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        "Order the rows by given column ; a negative column restores table order"
+        self.layoutAboutToBeChanged.emit()
+        if not 0 <= column < len(self.columns.names):  # also for an empty table
+            self.order = None
+        else:
+            self.order = argsort(self.columns.column(column))
+            if order == Qt.DescendingOrder:
+                self.order = self.order[::-1]
+        self.layoutChanged.emit()
+
+
+def argsort(values) -> object:
+    "Return the indexes sorting given values ; values of any type are accepted"
+    if numpy is not None:
+        try:
+            return numpy.argsort(values, kind="stable")
+        except TypeError:  # incomparable python objects
+            pass
+    try:
+        return sorted(range(len(values)), key=lambda row: _sort_key(values[row]))
+    except TypeError:  # incomparable values of the same type, such as dicts
+        return sorted(
+            range(len(values)), key=lambda row: _sort_key(values[row], as_text=True)
+        )
+
+
+def _sort_key(value: object, as_text: bool = False) -> tuple:
+    "Key ordering the values by type, or by text if as_text, and None at the end"
+    if value is None:
+        return (1, "", "")
+    return (0, type(value).__name__, str(value) if as_text else value)
+
+
+class TableViewer(QTableView):
+    "View of a table, with a cost independent of its number of rows"
+
+    def __init__(self, table=(), parent=None):
+        super().__init__(parent)
+        # all rows have the same height: no need to measure them
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.setModel(TableModel(table, self))
+        # initially in the table order ; sorted when a header is clicked
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.setSortingEnabled(True)
+
+    def set_table(self, table):
+        self.model().set_table(table)
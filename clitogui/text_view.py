@@ -0,0 +1,66 @@
+"""Implementation of a viewer of long texts
+
+The text is added to the view by chunks, one per iteration of the event loop,
+so that the dialog stays responsive while a multi-megabyte text is loaded.
+Only the visible lines are laid out.
+
+"""
+
+try:
+    from PySide2.QtWidgets import *
+    from PySide2.QtCore import *
+    from PySide2.QtGui import *
+except ImportError:
+    from PyQt5.QtWidgets import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtGui import *
+
+# number of characters added to the view at each iteration of the event loop
+APPEND_CHUNK = 2 ** 16
+
+
+class TextViewer(QPlainTextEdit):
+    "Read-only view of a long text, loaded in the background"
+
+    def __init__(self, text: str = "", parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)  # no need to lay out long lines
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self._pending = []  # texts still to append
+        self._offset = 0  # characters of the first pending text already appended
+        self._timer = QTimer(self)
+        self._timer.setInterval(0)  # whenever the event loop is idle
+        self._timer.timeout.connect(self._append_chunk)
+        self.set_text(text)
+
+    def set_text(self, text: str):
+        "Show given text instead of the current one"
+        self._timer.stop()
+        self._pending, self._offset = [], 0
+        self.clear()
+        self.append_text(text)
+
+    def append_text(self, text: str):
+        "Add given text after the current one"
+        if text:
+            self._pending.append(text)
+            self._timer.start()
+
+    def loading(self) -> bool:
+        "True if some text is still to be added to the view"
+        return bool(self._pending)
+
+    def _append_chunk(self):
+        text = self._pending[0]
+        chunk = text[self._offset : self._offset + APPEND_CHUNK]
+        # a cursor of our own, so that the user's one and the scrolling are kept
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(chunk)
+        self._offset += len(chunk)
+        if self._offset >= len(text):
+            self._pending.pop(0)
+            self._offset = 0
+        if not self._pending:
+            self._timer.stop()
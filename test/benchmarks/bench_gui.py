@@ -0,0 +1,68 @@
+"""Benchmarks of form construction, argument collection and preview refresh"""
+
+import pytest
+
+from .conftest import synthetic_parser
+
+
+OPTIONS = (10, 100, 1000)
+SUBPARSERS = (1, 50, 500)
+
+
+@pytest.fixture(
+    params=[(nb, 0) for nb in OPTIONS] + [(5, nb) for nb in SUBPARSERS],
+    ids=lambda size: "{}options-{}subparsers".format(*size),
+)
+def parser(request, qapp):
+    return synthetic_parser(*request.param)
+
+
+def test_extraction(benchmark, parser):
+    from clitogui.argument_extractor import ExtractedParser
+
+    benchmark(ExtractedParser, parser)
+
+
+def test_interface_init(benchmark, parser):
+    from clitogui.gui import Interface
+    from clitogui.argument_extractor import ExtractedParser
+
+    benchmark(Interface, ExtractedParser(parser))
+
+
+def test_parse_gui(benchmark, parser):
+    from clitogui.gui import Interface
+    from clitogui.argument_extractor import ExtractedParser
+
+    dialog = Interface(ExtractedParser(parser))
+    benchmark(dialog.parse_gui)
+
+
+def test_parse_gui_one_change(benchmark, parser):
+    from clitogui.gui import Interface
+    from clitogui.argument_extractor import ExtractedParser
+
+    dialog = Interface(ExtractedParser(parser))
+    spinbox = dialog.widgets[dialog.parser.by_name["option1"]]
+
+    def change_and_parse():
+        spinbox.setValue(spinbox.value() + 1)
+        return dialog.parse_gui()
+
+    benchmark(change_and_parse)
+
+
+def test_update_view(benchmark, parser):
+    from clitogui.interactive_gui import InteractiveInterface
+    from clitogui.argument_extractor import ExtractedParser
+
+    dialog = InteractiveInterface(
+        ExtractedParser(parser), lambda args: str(args), autorun=False
+    )
+    spinbox = dialog.widgets[dialog.parser.by_name["option1"]]
+
+    def change_and_update():
+        spinbox.setValue(spinbox.value() + 1)
+        dialog.update_view()
+
+    benchmark(change_and_update)
@@ -0,0 +1,46 @@
+"""Benchmarks of the output view on large outputs"""
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(scope="module")
+def large_image():
+    return Image.linear_gradient("L").resize((4096, 4096)).convert("RGB")
+
+
+def test_widgets_from_image(benchmark, qapp, large_image):
+    from clitogui.interactive_gui import widgets_from_values
+
+    benchmark(lambda: tuple(widgets_from_values(large_image)))
+
+
+@pytest.mark.parametrize("size", (100, 1000))
+def test_widgets_from_list(benchmark, qapp, size):
+    from clitogui.interactive_gui import widgets_from_values
+
+    values = ["line {}".format(index) for index in range(size)]
+    benchmark(lambda: tuple(widgets_from_values(values)))
+
+
+def test_show_values_images(benchmark, qapp, large_image):
+    from clitogui.interactive_gui import OutputView
+
+    view = OutputView(tabulate=True, tab_names=())
+    images = tuple(large_image.rotate(angle) for angle in (0, 90, 180))
+    benchmark(view.show_values, images)
+
+
+@pytest.mark.parametrize(
+    "options",
+    ({}, {"scaling": "percentile"}, {"colormap": "jet"}),
+    ids=("minmax", "percentile", "colormap"),
+)
+def test_array_to_pixels(benchmark, options):
+    numpy = pytest.importorskip("numpy")
+    from clitogui.arrays import to_pixels
+
+    array = numpy.random.default_rng(0).random((4096, 4096))
+    array[::97, ::89] = numpy.nan
+    benchmark(to_pixels, array, **options)
@@ -0,0 +1,42 @@
+"""Fixtures of the benchmarks: synthetic parsers
+
+The benchmarks are not run with the tests ; use `make bench`.
+The Qt application fixture, qapp, is shared with the tests.
+
+"""
+
+import argparse
+
+
+def synthetic_parser(nb_options: int, nb_subparsers: int = 0, nb_suboptions: int = 5):
+    """Return an argparse parser with given number of options of various types,
+    and given number of subparsers having each nb_suboptions options"""
+    parser = argparse.ArgumentParser()
+    add_options(parser, nb_options)
+    if nb_subparsers:
+        subparsers = parser.add_subparsers(dest="command")
+        for index in range(nb_subparsers):
+            subparser = subparsers.add_parser("command{}".format(index))
+            add_options(subparser, nb_suboptions, prefix="sub")
+    parser.old_parse_args = parser.parse_args
+    return parser
+
+
+def add_options(parser, nb_options: int, prefix: str = ""):
+    "Add to given parser options of all the types handled by clitogui"
+    for index in range(nb_options):
+        name = "--{}option{}".format(prefix, index)
+        kind = index % 6
+        if kind == 0:
+            parser.add_argument(name, type=str, default="value", help="a string")
+        elif kind == 1:
+            parser.add_argument(name, type=int, default=index, help="an integer")
+        elif kind == 2:
+            parser.add_argument(name, action="store_true", help="a flag")
+        elif kind == 3:
+            parser.add_argument(name, choices="ABC", default="B", help="a choice")
+        elif kind == 4:
+            parser.add_argument(name, action="count", default=0, help="a counter")
+        else:
+            parser.add_argument(name, default="in.txt", help="input file path")
+
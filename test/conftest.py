@@ -0,0 +1,18 @@
+"""Fixtures shared by the tests and the benchmarks"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def qapp(tmp_path_factory):
+    "The Qt application, without display, and a clean cache directory"
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ["XDG_CACHE_HOME"] = str(tmp_path_factory.mktemp("cache"))
+    try:
+        from PySide2.QtWidgets import QApplication
+    except ImportError:
+        from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    yield app
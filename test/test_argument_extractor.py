@@ -0,0 +1,49 @@
+"""Tests of the extraction of the model from the parser"""
+
+import argparse
+
+from clitogui.argument_extractor import ExtractedParser
+
+
+def make_parser(default: object = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=default)
+    parser.add_argument("--input", help="input file path")
+    parser.add_argument("--output", help="output directory path")
+    parser.add_argument("--name")
+    parser.add_argument("--verbose", action="count", default=0)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("run").add_argument("--fast", action="store_true")
+    return parser
+
+
+def test_argument_types():
+    by_name = ExtractedParser(make_parser()).by_name
+    assert by_name["size"].type is int
+    assert by_name["input"].type == "file_path"
+    assert by_name["output"].type == "directory_path"
+    assert by_name["name"].type is str and by_name["name"].help is None
+    assert by_name["verbose"].type == "count_action"
+    assert by_name["size"].cli == "--size"
+
+
+def test_defaults_are_kept_as_is():
+    default = object()
+    assert ExtractedParser(make_parser(default)).by_name["size"].default is default
+
+
+def test_subparsers():
+    extracted = ExtractedParser(make_parser())
+    assert [subparser.name for subparser in extracted.list_subparsers] == ["run"]
+    run = extracted.subparsers["run"]
+    assert [argument.name for argument in run.list_actions] == ["fast"]
+    assert run.by_name["fast"].type is bool and run.by_name["size"].type is int
+    assert "command" not in extracted.by_name
+
+
+def test_parser_actions_are_not_modified():
+    parser = make_parser()
+    actions = list(parser._actions)
+    ExtractedParser(parser)
+    assert parser._actions == actions
+    assert "-h" in parser.format_help()
@@ -0,0 +1,71 @@
+"""Tests of the display of numpy arrays as images"""
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from clitogui import arrays
+from clitogui.arrays import is_array, to_pixels, colormap_lut
+
+
+def test_is_array():
+    assert is_array(numpy.zeros((2, 3))) and is_array(numpy.zeros((2, 3, 4)))
+    assert not is_array(numpy.zeros(3)) and not is_array(numpy.zeros((2, 3, 2)))
+    assert not is_array([[0, 1]])
+
+
+def test_uint8_and_bool_arrays():
+    array = numpy.arange(6, dtype=numpy.uint8).reshape(2, 3)
+    assert (to_pixels(array) == array).all()
+    mask = numpy.array([[True, False]])
+    assert to_pixels(mask).tolist() == [[255, 0]]
+    rgb = numpy.zeros((2, 2, 3), numpy.uint8)[:, ::-1]  # not contiguous
+    assert to_pixels(rgb).flags.c_contiguous
+
+
+def test_minmax_scaling():
+    array = numpy.array([[-1.0, 0.0, 1.0]])
+    assert to_pixels(array).tolist() == [[0, 127, 255]]
+    assert to_pixels(numpy.full((2, 2), 7)).tolist() == [[0, 0], [0, 0]]
+    assert to_pixels(numpy.zeros((0, 3))).shape == (0, 3)
+
+
+def test_scaling_by_chunks(monkeypatch):
+    monkeypatch.setattr(arrays, "CHUNK_SIZE", 4)
+    array = numpy.arange(100, dtype=numpy.int32).reshape(10, 10)
+    expected = (array * (255 / 99)).astype(numpy.uint8)
+    assert (to_pixels(array) == expected).all()
+
+
+def test_percentile_scaling():
+    array = numpy.concatenate([numpy.arange(100.0), [1e9]]).reshape(1, -1)
+    pixels = to_pixels(array, scaling="percentile", percentiles=(0, 99))
+    assert pixels[0, 0] == 0 and pixels[0, -1] == 255  # outlier clipped
+    assert pixels[0, 50] == int(50 * 255 / 99)
+    with pytest.raises(ValueError):
+        to_pixels(array, scaling="other")
+
+
+def test_nan_and_infinite_values():
+    array = numpy.array([[numpy.nan, 0.0, 2.0, numpy.inf]])
+    pixels = to_pixels(array, nan_color=(1, 2, 3, 4))
+    assert pixels.shape == (1, 4, 4)
+    assert pixels[0, 0].tolist() == [1, 2, 3, 4]
+    assert pixels[0, 1].tolist() == [0, 0, 0, 255]
+    assert pixels[0, 2].tolist() == [255, 255, 255, 255]
+    rgb = numpy.zeros((1, 2, 3))
+    rgb[0, 1, 2] = numpy.nan
+    assert to_pixels(rgb)[:, :, 3].tolist() == [[255, 0]]
+
+
+def test_colormaps():
+    array = numpy.array([[0, 255]], numpy.uint8)
+    assert to_pixels(array, colormap="hot").tolist() == [
+        [[0, 0, 0, 255], [255, 255, 255, 255]]
+    ]
+    lut = numpy.zeros((256, 3))
+    lut[:, 0] = 1.0  # all red
+    assert to_pixels(array, colormap=lut)[0, 1].tolist() == [255, 0, 0, 255]
+    assert colormap_lut("gray").shape == (256, 4)
+    with pytest.raises(ValueError):
+        colormap_lut(numpy.zeros((10, 3)))
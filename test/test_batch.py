@@ -0,0 +1,70 @@
+"""Check the replay of recorded arguments by clitogui.batch"""
+
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAM = """
+import argparse
+import clitogui
+
+def compute(args):
+    if args.square < 0:
+        raise ValueError("negative")
+    return [str(args.square ** 2), {"verbose": args.verbose}]
+
+@clitogui.interactive(compute, autorun=False)
+def cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("square", type=int)
+    parser.add_argument("--verbose", "-v", action="store_true")
+    return parser
+"""
+
+
+def run_batch(program, records, output) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "clitogui.batch", str(program) + ":cli", str(records)]
+        + ["--output", str(output), "--workers", "2"],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+
+def test_batch_replays_records(tmp_path):
+    program = tmp_path / "program.py"
+    program.write_text(PROGRAM)
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "\n".join(
+            [
+                json.dumps({"args": ["3", "-v"], "time": "2024-01-01T00:00:00"}),
+                json.dumps(["-2"]),
+                json.dumps(["4"]),
+            ]
+        )
+    )
+    output = tmp_path / "results"
+    process = run_batch(program, records, output)
+    assert process.returncode == 1, process.stderr  # one job failed
+    assert "3 jobs" in process.stdout and "1 failed" in process.stdout
+    assert "job 1: -2 ValueError: negative" in process.stdout
+    lines = (output / "results.jsonl").read_text().splitlines()
+    results = {result["job"]: result for result in map(json.loads, lines)}
+    assert [results[index]["status"] for index in range(3)] == ["ok", "failed", "ok"]
+    assert (output / "job-00000-0.txt").read_text() == "9"
+    assert (output / "job-00002-0.txt").read_text() == "16"
+    assert os.path.exists(output / "job-00000-1.pickle")
+
+    records.write_text(json.dumps(["5"]))  # a new batch replaces the results
+    process = run_batch(program, records, output)
+    assert process.returncode == 0, process.stderr
+    lines = (output / "results.jsonl").read_text().splitlines()
+    assert [json.loads(line)["args"] for line in lines] == [["5"]]
+    assert (output / "job-00000-0.txt").read_text() == "25"
+    assert not os.path.exists(output / "job-00002-0.txt")
@@ -0,0 +1,100 @@
+"""Tests of the memoization of the callbacks outputs"""
+
+import os
+
+from PIL import Image
+
+from clitogui.cache import ResultCache, DiskCache, sizeof_output
+
+
+def callback(args):
+    return args
+
+
+def test_sizeof_output():
+    assert sizeof_output(Image.new("RGB", (10, 20))) == 600
+    assert sizeof_output(Image.new("F", (10, 20))) == 800
+    assert sizeof_output(memoryview(bytes(1000))) == 1000
+    images = [Image.new("L", (100, 100)), (Image.new("RGBA", (10, 10)), "text")]
+    assert sizeof_output(images) > 10000 + 400 + len("text")
+
+
+def test_result_cache_lru():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # now the most recently used
+    cache.put("c", 3)
+    assert "b" not in cache and len(cache) == 2
+    assert cache.get("b", "missing") == "missing"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_result_cache_byte_budget():
+    cache = ResultCache(max_entries=10, max_bytes=2500)
+    cache.put("a", bytearray(1000))
+    cache.put("b", bytearray(1000))
+    cache.put("a", bytearray(1000))  # replaced, not counted twice
+    assert len(cache) == 2 and cache.nbytes == 2 * sizeof_output(bytearray(1000))
+    cache.put("c", bytearray(1000))
+    assert "b" not in cache and "a" in cache and "c" in cache
+    cache.put("big", bytearray(3000))  # never kept
+    assert "big" not in cache and len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_result_cache_disabled():
+    cache = ResultCache(max_entries=0)
+    cache.put("a", 1)
+    assert "a" not in cache
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    gradient = Image.linear_gradient("L").resize((30, 20))
+    output = [gradient.convert(mode) for mode in ("L", "RGB", "RGBA", "P")]
+    output.append({"text": "done", "values": (1, 2.5, None)})
+    key = cache.key(callback, ["--n", "1"])
+    assert cache.get(key) is None
+    cache.put(key, output)
+    loaded = DiskCache(str(tmp_path)).get(key)
+    for image, original in zip(loaded[:-1], output):
+        assert image.mode == original.mode and image.tobytes() == original.tobytes()
+    assert loaded[3].getpalette() == output[3].getpalette()
+    assert loaded[-1] == output[-1]
+
+
+def test_disk_cache_key(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"))
+    path = tmp_path / "input.txt"
+    path.write_text("a")
+    key = cache.key(callback, ["--n", "1"], [str(path)])
+    assert key == cache.key(callback, ["--n", "1"], [str(path)])
+    assert key != cache.key(callback, ["--n", "2"], [str(path)])
+    assert key != cache.key(lambda args: args, ["--n", "1"], [str(path)])
+    os.utime(path, ns=(0, 0))
+    assert key != cache.key(callback, ["--n", "1"], [str(path)])
+    assert cache.key(print, ["--n", "1"]) is None  # no python code to hash
+
+
+def test_disk_cache_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=None)
+    keys = [cache.key(callback, [str(index)]) for index in range(4)]
+    for index, key in enumerate(keys):
+        cache.put(key, bytes(1000))
+        os.utime(os.path.join(str(tmp_path), key, "output.pickle"), (index, index))
+    cache.get(keys[0])  # now the most recently used
+    cache.max_bytes = 2500
+    cache.evict()
+    assert [cache.get(key) is not None for key in keys] == [True, False, False, True]
+
+
+def test_disk_cache_ignores_corrupted_entries(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    key = cache.key(callback, [])
+    cache.put(key, "output")
+    with open(os.path.join(str(tmp_path), key, "output.pickle"), "wb") as fd:
+        fd.write(b"truncated")
+    assert cache.get(key, "missing") == "missing"
+    assert not os.path.exists(os.path.join(str(tmp_path), key))
@@ -0,0 +1,99 @@
+"""Tests of the Interface: option widgets and generated command-line arguments"""
+
+import argparse
+
+import pytest
+
+from clitogui.gui import Interface, cli_from_value
+from clitogui.argument_extractor import ExtractedParser
+
+
+def parser_with_same_dests():
+    "Return a parser whose two subparsers have an option of the same dest"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verbose", action="store_true")
+    subparsers = parser.add_subparsers(dest="command")
+    first = subparsers.add_parser("a")
+    first.add_argument("--name", default="aa")
+    second = subparsers.add_parser("b")
+    second.add_argument("--name", default="bb")
+    parser.old_parse_args = parser.parse_args
+    return parser
+
+
+@pytest.fixture
+def dialog(qapp):
+    return Interface(ExtractedParser(parser_with_same_dests()))
+
+
+def test_same_dest_in_subparsers(dialog):
+    subparsers = dialog.parser.subparsers
+    dialog.tabs.setCurrentIndex(1)  # build the widgets of b
+    dialog.tabs.setCurrentIndex(0)
+    dialog.widgets[subparsers["a"].by_name["name"]].setText("edited")
+    assert dialog.parse_gui() == ["a", "--name", "edited"]
+    dialog.tabs.setCurrentIndex(1)
+    assert dialog.parse_gui() == ["b", "--name", "bb"]
+
+
+def test_never_shown_tab_uses_its_defaults(dialog):
+    dialog.parse_gui()  # tab a is read
+    dialog.tabs.blockSignals(True)  # b stays never shown
+    dialog.tabs.setCurrentIndex(1)
+    assert dialog.tabs.currentWidget().form_layout is None
+    assert dialog.parse_gui() == ["b", "--name", "bb"]
+
+
+def test_shared_options_are_shown_once(dialog):
+    verbose = dialog.parser.by_name["verbose"]
+    assert dialog.parser.subparsers["b"].by_name["verbose"] is verbose
+    dialog.widgets[verbose].setChecked(True)
+    dialog.tabs.setCurrentIndex(1)
+    assert dialog.parse_gui() == ["--verbose", "b", "--name", "bb"]
+
+
+def test_only_changed_widgets_are_read_again(dialog):
+    dialog.parse_gui()
+    assert not dialog._dirty
+    name = dialog.parser.subparsers["a"].by_name["name"]
+    dialog.widgets[name].setText("new")
+    assert dialog._dirty == {name}
+    assert dialog.parse_gui() == ["a", "--name", "new"]
+
+
+def test_cli_from_value():
+    parser = ExtractedParser(parser_with_same_dests())
+    name = parser.subparsers["a"].by_name["name"]
+    assert cli_from_value(name, "x") == ["--name", "x"]
+    assert cli_from_value(parser.by_name["verbose"], True) == ["--verbose"]
+    assert cli_from_value(parser.by_name["verbose"], False) == []
+
+
+def test_identical_options_in_subparsers(qapp):
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command")
+    for name in ("a", "b"):
+        subparsers.add_parser(name).add_argument("--name", default="same")
+    parser.old_parse_args = parser.parse_args
+    dialog = Interface(ExtractedParser(parser))
+    dialog.tabs.setCurrentIndex(1)
+    dialog.widgets[dialog.parser.subparsers["b"].by_name["name"]].setText("b")
+    assert dialog.parse_gui() == ["b", "--name", "b"]
+    dialog.tabs.setCurrentIndex(0)
+    assert dialog.parse_gui() == ["a", "--name", "same"]
+
+
+@pytest.mark.parametrize("with_subparsers", [False, True])
+def test_version_option_is_ignored(qapp, with_subparsers):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--version", action="version", version="1.0")
+    parser.add_argument("--size", type=int, default=2)
+    if with_subparsers:
+        subparsers = parser.add_subparsers(dest="command")
+        run = subparsers.add_parser("run")
+        run.add_argument("--version", action="version", version="2.0")
+    parser.old_parse_args = parser.parse_args
+    dialog = Interface(ExtractedParser(parser))
+    expected = ["--size", "2"] + (["run"] if with_subparsers else [])
+    assert dialog.parse_gui() == expected
+    assert dialog.version_text == "1.0\n"
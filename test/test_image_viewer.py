@@ -0,0 +1,171 @@
+"""Tests of the image viewer: conversion to QImage, and tiles of the large images"""
+
+import gc
+import time
+
+import numpy
+import pytest
+from PIL import Image
+
+try:
+    from PySide2.QtCore import QRectF
+    from PySide2.QtGui import QImage, QPainter
+    from PySide2.QtWidgets import QGraphicsScene
+except ImportError:
+    from PyQt5.QtCore import QRectF
+    from PyQt5.QtGui import QImage, QPainter
+    from PyQt5.QtWidgets import QGraphicsScene
+
+from clitogui import image_viewer
+from clitogui.cache import DiskCache
+from clitogui.image_viewer import ImageItem, TiledImageItem, TILE_SIZE, to_qimage
+
+
+def rgba(qimage: QImage, x: int, y: int) -> tuple:
+    color = qimage.pixelColor(x, y)
+    return color.red(), color.green(), color.blue(), color.alpha()
+
+
+def image_with_pixel(mode: str, value: object) -> Image:
+    "Return a black 3x2 image of given mode, whose pixel (1, 0) is value"
+    image = Image.new(mode, (3, 2))  # rows of 3 pixels are not 4-bytes aligned
+    if mode == "P":
+        image.putpalette([0, 0, 0, 10, 20, 30])
+    image.putpixel((1, 0), value)
+    return image
+
+
+@pytest.mark.parametrize(
+    "mode, value, expected",
+    [
+        ("L", 77, (77, 77, 77, 255)),
+        ("RGB", (1, 2, 3), (1, 2, 3, 255)),
+        ("RGBA", (1, 2, 3, 128), (1, 2, 3, 128)),
+        ("I;16", 40000, (round(40000 / 257),) * 3 + (255,)),
+        ("P", 1, (10, 20, 30, 255)),
+        ("1", 1, (255, 255, 255, 255)),
+    ],
+)
+def test_image_modes(qapp, mode, value, expected):
+    qimage = to_qimage(image_with_pixel(mode, value))
+    assert (qimage.width(), qimage.height()) == (3, 2)
+    assert rgba(qimage, 1, 0) == expected
+    assert rgba(qimage, 2, 1)[:3] == (0, 0, 0)
+
+
+def test_array_pixels_are_shared(qapp):
+    array = numpy.zeros((2, 3, 3), dtype=numpy.uint8)
+    qimage = to_qimage(array)
+    assert qimage._buffer.obj is array  # the QImage keeps the array alive
+    array[0, 1] = (9, 8, 7)
+    assert rgba(qimage, 1, 0) == (9, 8, 7, 255)  # same memory
+    del array
+    gc.collect()
+    assert rgba(qimage, 1, 0) == (9, 8, 7, 255)
+    flipped = numpy.zeros((2, 3), dtype=numpy.uint8)[:, ::-1]
+    assert to_qimage(flipped)._buffer.obj is not flipped.base  # copied once
+    with pytest.raises(TypeError):
+        to_qimage(numpy.zeros((2, 3), dtype=float))
+
+
+@pytest.mark.parametrize(
+    "mode, value", [("L", 77), ("RGBA", (1, 2, 3, 4)), ("I;16", 40000)]
+)
+def test_cached_image_pixels_are_shared(qapp, tmp_path, mode, value):
+    cache = DiskCache(str(tmp_path))
+    key = cache.key(image_with_pixel, [mode])
+    cache.put(key, image_with_pixel(mode, value))
+    loaded = cache.get(key)
+    item = ImageItem(loaded)
+    assert item.qimage._buffer is loaded._raw_buffer  # the mapped file
+    assert item.boundingRect() == QRectF(0, 0, 3, 2)
+    expected = rgba(to_qimage(image_with_pixel(mode, value)), 1, 0)
+    del loaded
+    gc.collect()
+    assert rgba(item.qimage, 1, 0) == expected
+
+
+def wait_levels(qapp, item: TiledImageItem, timeout: float = 10):
+    "Process the Qt events until all levels of the item are built"
+    start = time.perf_counter()
+    while len(item.levels) <= item.max_level:
+        assert time.perf_counter() - start < timeout
+        qapp.processEvents()
+        time.sleep(0.001)
+
+
+def test_levels_are_built_in_background(qapp):
+    item = TiledImageItem(Image.new("RGB", (3000, 2000), "red"))
+    assert item.max_level == 3 and len(item.levels) == 1
+    assert item.boundingRect() == QRectF(0, 0, 3000, 2000)
+    wait_levels(qapp, item)
+    assert [level.size for level in item.levels[1:]] == [
+        (1500, 1000),
+        (750, 500),
+        (375, 250),
+    ]
+    item.set_image(Image.new("P", (1200, 600)))  # the levels are built again
+    assert len(item.levels) == 1 and item.max_level == 2
+    assert item.boundingRect() == QRectF(0, 0, 1200, 600)
+    wait_levels(qapp, item)
+    assert [level.size for level in item.levels] == [
+        (1200, 600),
+        (600, 300),
+        (300, 150),
+    ]
+    assert item.levels[1].mode == "RGBA"
+
+
+def test_painting_does_not_build_levels(qapp):
+    item = TiledImageItem(Image.new("L", (3000, 2000)))
+    scene = QGraphicsScene()
+    scene.addItem(item)
+    target = QImage(300, 200, QImage.Format_RGB32)
+    target.fill(0)
+    painter = QPainter(target)
+    scene.render(painter)  # scaled down by 10: level 3 is needed
+    painter.end()
+    assert len(item.levels) == 1 and not item.tiles
+    wait_levels(qapp, item)
+    painter = QPainter(target)
+    scene.render(painter)
+    painter.end()
+    assert len(item.tiles) == 1 and (3, 0, 0) in item.tiles
+
+
+def test_level_selection(qapp):
+    item = TiledImageItem(Image.new("L", (3000, 2000)))
+    assert [item.level_index(scale) for scale in (2, 1, 0.6, 0.5, 0.3, 0.01)] == [
+        0,
+        0,
+        0,
+        1,
+        1,
+        3,
+    ]
+
+
+def test_tile_selection(qapp):
+    item = TiledImageItem(Image.new("L", (3000, 2000)))
+    wait_levels(qapp, item)
+    tiles = list(item.visible_tiles(0, QRectF(10, 10, 600, 100)))
+    assert [(column, row) for column, row, _, _ in tiles] == [(0, 0), (1, 0)]
+    assert tiles[1][2] == QRectF(TILE_SIZE, 0, TILE_SIZE, TILE_SIZE)
+    # level 1 is 1500x1000 pixels: 3x2 tiles, drawn twice as large
+    tiles = list(item.visible_tiles(1, QRectF(-100, -100, 5000, 5000)))
+    assert len(tiles) == 6
+    column, row, target, source = tiles[-1]
+    assert (column, row) == (2, 1)
+    assert source == QRectF(0, 0, 1500 - 2 * TILE_SIZE, 1000 - TILE_SIZE)
+    assert target == QRectF(4 * TILE_SIZE, 2 * TILE_SIZE, 952, 976)
+
+
+def test_tile_cache_is_bounded(qapp, monkeypatch):
+    monkeypatch.setattr(image_viewer, "TILE_CACHE_TILES", 2)
+    item = TiledImageItem(Image.new("L", (3000, 2000)))
+    last = item.tile(0, 5, 3)
+    assert (last.width(), last.height()) == (3000 - 5 * TILE_SIZE, 2000 - 3 * TILE_SIZE)
+    assert item.tile(0, 5, 3) is last  # from the cache
+    item.tile(0, 0, 0)
+    item.tile(0, 1, 0)
+    assert len(item.tiles) == 2 and (0, 5, 3) not in item.tiles
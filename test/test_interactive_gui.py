@@ -0,0 +1,144 @@
+"""Tests of the InteractiveInterface: autorun, streamed outputs, progress,
+cancellation and previews"""
+
+import time
+import argparse
+import threading
+
+from PIL import Image
+
+from clitogui import interactive_gui
+from clitogui.argument_extractor import ExtractedParser
+from clitogui.interactive_gui import InteractiveInterface
+
+
+def wait_for(qapp, condition, timeout: float = 10):
+    "Process the Qt events until condition() is true"
+    start = time.perf_counter()
+    while not condition() and time.perf_counter() - start < timeout:
+        qapp.processEvents()
+        time.sleep(0.001)
+    assert condition()
+
+
+def interface(callback, **options) -> InteractiveInterface:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=3)
+    parser.old_parse_args = parser.parse_args
+    options.setdefault("autorun", False)
+    return InteractiveInterface(ExtractedParser(parser), callback, **options)
+
+
+def shown_texts(dialog: InteractiveInterface) -> list:
+    return [leaves[0].text() for _, _, leaves in dialog.output_view.entries]
+
+
+def test_streamed_items_are_shown_as_yielded(qapp):
+    release = threading.Event()
+
+    def items(args):
+        for index in range(args.n):
+            if index == 2:
+                release.wait(10)
+            yield "item {}".format(index)
+
+    dialog = interface(items, stream=True, cache_size=4)
+    dialog.update_view()
+    wait_for(qapp, lambda: len(dialog.output_view.entries) == 2)
+    assert shown_texts(dialog) == ["item 0", "item 1"] and dialog.runner.running
+    release.set()
+    wait_for(qapp, lambda: not dialog.runner.running)
+    assert shown_texts(dialog) == ["item 0", "item 1", "item 2"]
+    assert dialog.last_callback_output == ("item 0", "item 1", "item 2")
+    dialog.widgets[dialog.parser.by_name["n"]].setValue(1)
+    dialog.update_view()  # fewer items: the extra entries are removed
+    wait_for(qapp, lambda: not dialog.runner.running)
+    assert shown_texts(dialog) == ["item 0"]
+    dialog.widgets[dialog.parser.by_name["n"]].setValue(3)
+    dialog.update_view()  # all items at once, from the cache
+    assert not dialog.runner.running
+    assert shown_texts(dialog) == ["item 0", "item 1", "item 2"]
+    dialog.runner.shutdown()
+
+
+def test_running_callback_can_be_cancelled(qapp):
+    def slow(args):
+        if args.n == 3:
+            return "previous"
+        args._run.progress(0.5, "halfway")
+        while not args._run.cancelled():
+            time.sleep(0.001)
+        return "cancelled"
+
+    dialog = interface(slow, progress=True)
+    dialog.update_view()
+    wait_for(qapp, lambda: not dialog.runner.running)
+    assert dialog.progress_bar.isHidden() and shown_texts(dialog) == ["previous"]
+    dialog.widgets[dialog.parser.by_name["n"]].setValue(4)
+    dialog.update_view()
+    wait_for(qapp, lambda: dialog.progress_bar.value() == 500)
+    assert not dialog.progress_bar.isHidden()
+    assert dialog.progress_bar.format().startswith("halfway")
+    context = dialog.runner.context
+    dialog.cancel_button.click()
+    assert context.cancelled() and not dialog.runner.running
+    assert dialog.progress_bar.isHidden() and dialog.cancel_button.isHidden()
+    dialog.runner.pool.waitForDone()
+    qapp.processEvents()
+    assert shown_texts(dialog) == ["previous"]  # the view is left unchanged
+    dialog.runner.shutdown()
+
+
+def run_values(**options) -> (InteractiveInterface, list):
+    "Return an autorun dialog, and the list of the values of n it was run with"
+    runs = []
+    dialog = interface(lambda args: runs.append(args.n) or "done", **options)
+    return dialog, runs
+
+
+def test_burst_of_edits_runs_the_callback_once(qapp):
+    dialog, runs = run_values(autorun=True, debounce_ms=50)
+    spinbox = dialog.widgets[dialog.parser.by_name["n"]]
+    for value in (4, 5, 6):
+        spinbox.setValue(value)
+    assert not runs and dialog.autorun_timer.isActive()
+    wait_for(qapp, lambda: runs)
+    qapp.processEvents()
+    assert runs == [6] and shown_texts(dialog) == ["done"]
+
+
+def test_no_debounce_runs_the_callback_on_each_edit(qapp):
+    dialog, runs = run_values(autorun=True)
+    spinbox = dialog.widgets[dialog.parser.by_name["n"]]
+    for value in (4, 5):
+        spinbox.setValue(value)
+    assert runs == [4, 5] and not dialog.autorun_timer.isActive()
+
+
+def test_preview_is_replaced_by_full_quality_on_accept(qapp, monkeypatch):
+    monkeypatch.setattr(interactive_gui, "PREVIEW_MAX_PIXELS", 100 * 100)
+    downscaled, scales = [], []
+    downscaled_value = interactive_gui.downscaled_value
+
+    def spied_downscaled_value(value):
+        downscaled.append(value)
+        return downscaled_value(value)
+
+    monkeypatch.setattr(interactive_gui, "downscaled_value", spied_downscaled_value)
+
+    def render(args):
+        scales.append(args._preview)
+        scale = args._preview or 1
+        return Image.new("L", (int(800 * scale), int(400 * scale)))
+
+    dialog = interface(render, autorun=True, preview=0.5)
+    dialog.widgets[dialog.parser.by_name["n"]].setValue(4)
+    assert scales == [0.5] and downscaled == [dialog.last_callback_output]
+    assert dialog.last_callback_output.size == (400, 200)
+    # 80000 pixels computed, shown downscaled by 3 to fit in 10000
+    item = dialog.output_view.entries[0][2][0].view.png_item
+    assert (item.qimage.width(), item.qimage.height()) == (134, 67)
+    dialog._on_accept()
+    assert scales == [0.5, None]
+    assert dialog.last_callback_output.size == (800, 400)
+    assert dialog.parsed_args()._output.size == (800, 400)
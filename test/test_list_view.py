@@ -0,0 +1,54 @@
+"""Tests of the viewer of long lists"""
+
+import pytest
+from PIL import Image
+
+try:
+    from PySide2.QtCore import Qt
+except ImportError:
+    from PyQt5.QtCore import Qt
+
+from clitogui import list_view
+from clitogui.list_view import ListModel, ListViewer, thumbnail_of
+
+
+def test_rows_are_fetched_by_batches(qapp, monkeypatch):
+    monkeypatch.setattr(list_view, "FETCH_BATCH", 10)
+    model = ListModel(list(range(25)))
+    assert model.rowCount() == 10 and model.canFetchMore()
+    model.fetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 25 and not model.canFetchMore()
+    model.set_values(["a", "b"])
+    assert model.rowCount() == 2
+
+
+def test_displayed_values(qapp):
+    image = Image.new("RGB", (200, 100))
+    model = ListModel(["text", 3.5, image])
+    assert [model.data(model.index(row)) for row in range(3)] == [
+        "text",
+        "3.5",
+        "200×100",
+    ]
+    assert model.data(model.index(0), Qt.ToolTipRole) == "text"
+    assert model.data(model.index(1), Qt.DecorationRole) is None
+    thumbnail = model.data(model.index(2), Qt.DecorationRole)
+    assert (thumbnail.width(), thumbnail.height()) == (64, 32)
+    assert model.data(model.index(2), Qt.DecorationRole) is thumbnail  # cached
+
+
+def test_thumbnails():
+    assert thumbnail_of(Image.new("L", (10, 640))).size == (1, 64)
+    small = Image.new("L", (10, 10))
+    assert thumbnail_of(small) is small
+    numpy = pytest.importorskip("numpy")
+    pixels = thumbnail_of(numpy.zeros((640, 320)))
+    assert pixels.shape[:2] == (64, 32) and pixels.dtype == numpy.uint8
+
+
+def test_viewer(qapp):
+    viewer = ListViewer(range(5000))
+    assert viewer.model().rowCount() == list_view.FETCH_BATCH
+    viewer.set_values([1, 2])
+    assert viewer.model().rowCount() == 2
@@ -0,0 +1,38 @@
+"""Tests of the immutable model of the arguments"""
+
+import pytest
+
+from clitogui.model import ArgumentSpec, SubparserSpec
+
+
+def spec(name: str = "size", default: object = 3) -> ArgumentSpec:
+    return ArgumentSpec(["--" + name], name, None, "help", default, int)
+
+
+def test_specs_are_immutable():
+    arg = spec()
+    with pytest.raises(AttributeError):
+        arg.default = 4
+    with pytest.raises(AttributeError):
+        arg.other = 4
+    assert not hasattr(arg, "__dict__")
+    assert arg["default"] == arg.default == 3  # also readable as a dict
+    assert "default=3" in repr(arg)
+
+
+def test_specs_identity():
+    arg, same = spec(), spec()
+    assert arg == arg and arg != same  # identical options of two subparsers
+    assert {arg: 1, same: 2}[arg] == 1 and len({arg, same}) == 2
+
+
+def test_subparser_spec():
+    parent, own = (spec("verbose"),), [spec("fast"), spec("size")]
+    subparser = SubparserSpec("run", iter(own), parent)
+    assert subparser.list_actions == tuple(own)
+    assert subparser.arguments == parent + tuple(own)
+    assert subparser.by_name["fast"] is own[0]
+    with pytest.raises(TypeError):
+        subparser.by_name["other"] = spec("other")
+    with pytest.raises(AttributeError):
+        subparser.name = "other"
@@ -0,0 +1,63 @@
+"""Tests of the OutputView: in-place updates and tabs"""
+
+import pytest
+from PIL import Image
+
+from clitogui.image_viewer import ImageViewer
+from clitogui.interactive_gui import OutputView
+
+
+@pytest.fixture
+def view(qapp):
+    return OutputView(tabulate=True, tab_names=["first"])
+
+
+def test_tabulated_entries_are_in_tabs(view):
+    view.show_values(("a", "b", "c"))
+    assert view.tabs is not None
+    assert view.tabs.count() == 3
+    assert [view.tabs.tabText(index) for index in range(3)] == [
+        "first",
+        "tab 2",
+        "tab 3",
+    ]
+
+
+def test_same_shape_is_updated_in_place(view):
+    view.show_values(("a", "b"))
+    label = view.entries[0][2][0]
+    view.show_values(("c", "d"))
+    assert view.entries[0][2][0] is label
+    assert label.text() == "c"
+
+
+def test_new_shape_rebuilds_entries(view):
+    view.show_values(("a", "b", "c"))
+    view.show_values(("a", 1))
+    assert view.tabs.count() == 2
+    view.show_values("single value")
+    assert view.tabs is None
+    assert len(view.entries) == 1
+
+
+def test_tabs_are_built_when_shown(view):
+    view.show_values(("a", "b"))
+    assert view.entries[0][2][0].text() == "a"
+    assert view.entries[1][2] == [] and 1 in view.stale  # not built yet
+    view.show_values(("c", "d"))
+    assert view.values[1] == "d" and view.entries[1][2] == []
+    view.tabs.setCurrentIndex(1)
+    assert view.entries[1][2][0].text() == "d" and not view.stale
+
+
+def test_least_recently_viewed_tabs_are_released(qapp):
+    images = tuple(Image.new("RGB", (10, 10)) for _ in range(3))  # 300 bytes each
+    view = OutputView(tabulate=True, tab_names=[], max_tab_bytes=400)
+    view.show_values(images)
+    for index in (1, 2):
+        view.tabs.setCurrentIndex(index)
+    assert view.entries[0][2] == [] and 0 in view.stale  # released
+    assert isinstance(view.entries[1][2][0], ImageViewer)  # still built
+    view.tabs.setCurrentIndex(0)  # built again
+    assert isinstance(view.entries[0][2][0], ImageViewer)
+    assert view.entries[1][2] == []
@@ -0,0 +1,72 @@
+"""Tests of the timing of the phases of the dialogs"""
+
+import os
+import sys
+import json
+import subprocess
+
+from clitogui import profiling
+from clitogui.profiling import Profiler
+
+
+def test_phases_are_counted():
+    profiler = Profiler()
+    for _ in range(2):
+        with profiler.phase("parse_gui"):
+            with profiling.phase("parse_args"):  # nested in the running phase
+                pass
+    assert list(profiler.last) == ["parse_gui", "parse_args"]
+    assert profiler.count == {"parse_gui": 2, "parse_args": 2}
+    assert "parse_gui" in profiler.summary()
+
+
+def test_new_run_forgets_pending_phases():
+    profiler = Profiler()
+    with profiler.phase("dialog"):  # spans several runs
+        profiler.begin("callback")  # never ended, as on a cache hit
+        profiler.new_run()
+        profiler.end("callback")
+        assert "callback" not in profiler.last and not profiler.count
+        profiler.begin("callback")
+        profiler.end("callback")
+    assert profiler.count == {"callback": 1, "dialog": 1}
+    assert profiler.total["dialog"] >= profiler.total["callback"]
+
+
+def test_hooks(monkeypatch):
+    calls = []
+    monkeypatch.setattr(profiling, "HOOKS", [lambda *call: calls.append(call)])
+    profiler = Profiler()
+    with profiler.phase("render"):
+        pass
+    assert [(name, duration is None) for _, name, duration in calls] == [
+        ("render", True),
+        ("render", False),
+    ]
+
+
+TRACED = """
+from clitogui import profiling
+profiler = profiling.Profiler()
+with profiler.phase("parse_gui"):
+    pass
+with profiling.phase("outside"):
+    pass
+"""
+
+
+def test_trace_file(tmp_path):
+    path = tmp_path / "trace-{pid}.json"
+    subprocess.run(
+        [sys.executable, "-c", TRACED],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ, CLITOGUI_TRACE=str(path)),
+        check=True,
+    )
+    (trace,) = tmp_path.iterdir()
+    events = json.loads(trace.read_text())
+    assert [event["name"] for event in events] == [
+        "parse_gui",
+        "outside",
+        "process_name",
+    ]
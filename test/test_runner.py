@@ -0,0 +1,255 @@
+"""Tests of the runners executing the callbacks in background"""
+
+import os
+import sys
+import time
+import subprocess
+import threading
+
+import pytest
+from PIL import Image
+
+from clitogui import runner
+from clitogui.runner import Runner, ThreadRunner, ProcessRunner
+
+
+def wait_for(qapp, condition, timeout: float = 10):
+    "Process the Qt events until condition() is true"
+    start = time.perf_counter()
+    while not condition() and time.perf_counter() - start < timeout:
+        qapp.processEvents()
+        time.sleep(0.001)
+    assert condition()
+
+
+class Outcomes:
+    "Record the signals of given runner"
+
+    def __init__(self, runner: Runner):
+        self.outputs, self.errors = [], []
+        runner.finished.connect(self.outputs.append)
+        runner.failed.connect(self.errors.append)
+
+
+def test_base_runner_runs_in_calling_thread(qapp):
+    base = Runner()
+    outcomes = Outcomes(base)
+    base.submit(lambda: 42)
+    assert outcomes.outputs == [42] and not base.running
+    base.submit(lambda: iter(()))
+    base.submit(lambda: 1 / 0)
+    assert isinstance(outcomes.errors[0], ZeroDivisionError)
+
+
+@pytest.fixture
+def thread_runner(qapp):
+    thread_runner = ThreadRunner()
+    yield thread_runner
+    thread_runner.shutdown()
+    thread_runner.pool.waitForDone()
+
+
+def test_thread_runner_emits_only_newest_job(qapp, thread_runner):
+    thread_runner.pool.setMaxThreadCount(2)  # even on a single core
+    outcomes = Outcomes(thread_runner)
+    release = threading.Event()
+    first = thread_runner.submit(lambda: release.wait(10) and "superseded")
+    second = thread_runner.submit(lambda: "newest")
+    assert second == first + 1 and thread_runner.running
+    wait_for(qapp, lambda: outcomes.outputs)
+    release.set()
+    thread_runner.pool.waitForDone()
+    qapp.processEvents()
+    assert outcomes.outputs == ["newest"] and not thread_runner.running
+
+
+def test_thread_runner_discard(qapp, thread_runner):
+    outcomes = Outcomes(thread_runner)
+    thread_runner.submit(time.sleep, 0.05)
+    thread_runner.discard()
+    assert not thread_runner.running
+    thread_runner.pool.waitForDone()
+    qapp.processEvents()
+    assert outcomes.outputs == [] and outcomes.errors == []
+    thread_runner.submit(lambda: 1 / 0)
+    wait_for(qapp, lambda: outcomes.errors)
+    assert isinstance(outcomes.errors[0], ZeroDivisionError)
+
+
+def test_thread_runner_timeout(qapp):
+    thread_runner = ThreadRunner(timeout=0.05)
+    outcomes = Outcomes(thread_runner)
+    release = threading.Event()
+    thread_runner.submit(release.wait, 10)
+    wait_for(qapp, lambda: outcomes.errors)
+    release.set()
+    thread_runner.pool.waitForDone()
+    qapp.processEvents()
+    assert isinstance(outcomes.errors[0], TimeoutError) and not outcomes.outputs
+
+
+def test_thread_runner_streams_generators(qapp, thread_runner):
+    outcomes = Outcomes(thread_runner)
+    items = []
+    thread_runner.yielded.connect(items.append)
+    thread_runner.submit(lambda: (index * 2 for index in range(3)))
+    wait_for(qapp, lambda: outcomes.outputs)
+    assert items == [0, 2, 4] and outcomes.outputs == [(0, 2, 4)]
+
+
+def test_thread_runner_closes_superseded_generators(qapp, thread_runner):
+    closed, started = threading.Event(), threading.Event()
+
+    def endless():
+        try:
+            while True:
+                started.set()
+                yield time.sleep(0.001)
+        finally:
+            closed.set()
+
+    thread_runner.submit(endless)
+    assert started.wait(10)
+    thread_runner.discard()
+    assert closed.wait(10)
+
+
+def test_run_context_reports():
+    reports = []
+    context = runner.RunContext(lambda *report: reports.append(report))
+    context.progress(-1, "start")
+    context.progress(0.5)  # too soon after the previous one: dropped
+    context.progress(2, "done")  # the end is always reported
+    assert reports == [(0.0, "start"), (1.0, "done")]
+    assert not context.cancelled()
+    context.cancel()
+    assert context.cancelled()
+    runner.RunContext().progress(0.5)  # nowhere to report
+
+
+def test_discard_cancels_the_context(qapp, thread_runner):
+    progress = []
+    thread_runner.progressed.connect(lambda *report: progress.append(report))
+    context = thread_runner.new_context()
+
+    def job():
+        context.progress(1, "halfway")
+        while not context.cancelled():
+            time.sleep(0.001)
+        return "cancelled"
+
+    outcomes = Outcomes(thread_runner)
+    thread_runner.submit(job, context=context)
+    wait_for(qapp, lambda: progress)
+    assert progress == [(1.0, "halfway")]
+    thread_runner.discard()
+    assert context.cancelled()
+    thread_runner.pool.waitForDone()
+    qapp.processEvents()
+    assert not outcomes.outputs
+
+
+def report_progress(context: runner.RunContext):
+    context.progress(0.5, "in a worker")
+    time.sleep(30)  # until terminated: progress of finished jobs is ignored
+
+
+def test_progress_of_worker_processes(qapp, process_runner):
+    progress = []
+    process_runner.progressed.connect(lambda *report: progress.append(report))
+    context = process_runner.new_context()
+    process_runner.submit(report_progress, context, context=context)
+    wait_for(qapp, lambda: progress)
+    assert progress == [(0.5, "in a worker")]
+    process_runner.discard()
+
+
+def images(width: int) -> list:
+    return [
+        Image.linear_gradient("L").resize((width, 7)).convert(mode)
+        for mode in ("L", "RGB", "RGBA", "P", "1", "I", "F")
+    ]
+
+
+def block_names(prefix: str) -> list:
+    "Return the shared memory blocks of given prefix, where they can be listed"
+    return [name for name in os.listdir("/dev/shm") if name.startswith(prefix)]
+
+
+@pytest.fixture
+def process_runner(qapp):
+    process_runner = ProcessRunner()
+    yield process_runner
+    process_runner.shutdown()
+
+
+@pytest.mark.parametrize("strip_bytes", [2 ** 20, 100])
+def test_images_through_shared_memory(qapp, process_runner, monkeypatch, strip_bytes):
+    monkeypatch.setattr(runner, "STRIP_BYTES", strip_bytes)  # inherited by fork
+    outcomes = Outcomes(process_runner)
+    process_runner.submit(images, 33)
+    wait_for(qapp, lambda: outcomes.outputs or outcomes.errors)
+    assert not outcomes.errors
+    for received, sent in zip(outcomes.outputs[0], images(33)):
+        assert received.mode == sent.mode
+        assert received.tobytes() == sent.tobytes()
+
+
+class SlowToPickle:
+    "Object whose pickling takes a while, once the images are in shared memory"
+
+    def __reduce__(self):
+        time.sleep(30)
+        return SlowToPickle, ()
+
+
+def slow_output() -> tuple:
+    return Image.new("RGB", (64, 64)), Image.new("L", (64, 64)), SlowToPickle()
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="can't list the blocks")
+def test_blocks_of_terminated_worker_are_released(qapp, process_runner):
+    prefix = process_runner._block_prefix
+    outcomes = Outcomes(process_runner)
+    process_runner.submit(slow_output)
+    wait_for(qapp, lambda: len(block_names(prefix)) == 2)
+    process_runner.discard()  # terminates the worker
+    wait_for(qapp, lambda: not block_names(prefix))
+    process_runner.submit(pow, 2, 3)  # by a new worker
+    wait_for(qapp, lambda: outcomes.outputs)
+    assert outcomes.outputs == [8]
+
+
+SESSION = """
+import time
+import subprocess
+from PIL import Image
+from clitogui.runner import ProcessRunner
+try:
+    from PySide2.QtWidgets import QApplication
+except ImportError:
+    from PyQt5.QtWidgets import QApplication
+app = QApplication([])
+process_runner = ProcessRunner()
+outputs = []
+process_runner.finished.connect(outputs.append)
+process_runner.submit(Image.new, "RGB", (8, 8))
+while not outputs:
+    app.processEvents()
+    time.sleep(0.001)
+process_runner.shutdown()
+"""
+
+
+def test_no_block_left_to_the_resource_tracker():
+    process = subprocess.run(
+        [sys.executable, "-c", SESSION],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        timeout=60,
+    )
+    assert process.returncode == 0, process.stderr
+    assert "resource_tracker" not in process.stderr
@@ -0,0 +1,52 @@
+"""Check that programs run with explicit arguments don't load the GUI libraries"""
+
+import os
+import sys
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import sys
+import argparse
+import clitogui
+
+def compute(args):
+    return str(args.square ** 2)
+
+@clitogui.{decorator}
+def cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("square", type=int)
+    parser.add_argument("--verbose", "-v", action="store_true")
+    return parser
+
+args = cli().parse_args(["3", "-v"])
+assert args.square == 3 and args.verbose
+print(" ".join(sorted(
+    name for name in sys.modules
+    if name.split(".")[0] in {{"PyQt5", "PySide2", "PIL"}}
+)))
+"""
+
+
+def loaded_gui_modules(decorator: str) -> str:
+    "Return the GUI modules loaded by a CLI-argument run of a decorated parser"
+    process = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(decorator=decorator)],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert process.returncode == 0, process.stderr
+    return process.stdout.strip()
+
+
+def test_clitogui_decorator_does_not_import_gui():
+    assert loaded_gui_modules("clitogui") == ""
+
+
+def test_interactive_decorator_does_not_import_gui():
+    assert loaded_gui_modules("interactive(compute, autorun=False)") == ""
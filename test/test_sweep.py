@@ -0,0 +1,99 @@
+"""Tests of the parameter sweeps"""
+
+import time
+import argparse
+
+import pytest
+
+from clitogui.argument_extractor import ExtractedParser
+from clitogui.interactive_gui import InteractiveInterface
+from clitogui.sweep import parse_sweep_values, combinations
+
+
+def sweep_parser():
+    "Return a parser whose two subparsers have an option of the same dest"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1)
+    subparsers = parser.add_subparsers(dest="command")
+    for name in ("a", "b"):
+        subparser = subparsers.add_parser(name)
+        subparser.add_argument("--mode", choices=["x", "y", "z"], default="x")
+        subparser.add_argument("--flag", action="store_true")
+    parser.old_parse_args = parser.parse_args
+    return parser
+
+
+def describe(args) -> str:
+    return "{} n={} mode={} flag={}".format(args.command, args.n, args.mode, args.flag)
+
+
+@pytest.fixture
+def dialog(qapp):
+    parser = ExtractedParser(sweep_parser())
+    return InteractiveInterface(
+        parser, describe, autorun=False, sweep=True, cache_size=16
+    )
+
+
+def test_parse_sweep_values():
+    parser = ExtractedParser(sweep_parser())
+    n = parser.by_name["n"]
+    mode = parser.subparsers["a"].by_name["mode"]
+    flag = parser.subparsers["a"].by_name["flag"]
+    assert parse_sweep_values("1:7:3, 9", n) == [1, 4, 7, 9]
+    assert parse_sweep_values("5:1:-2", n) == [5, 3, 1]
+    assert parse_sweep_values("*", mode) == ["x", "y", "z"]
+    assert parse_sweep_values("yes, off", flag) == [True, False]
+    for text, arg in (("1:x", n), ("1:2:0", n), ("w", mode), ("maybe", flag)):
+        with pytest.raises(ValueError):
+            parse_sweep_values(text, arg)
+
+
+def test_combinations():
+    assert combinations({"a": [1, 2], "b": ["x"]}) == [
+        {"a": 1, "b": "x"},
+        {"a": 2, "b": "x"},
+    ]
+
+
+def test_sweep_jobs_leave_the_dialog_unchanged(dialog):
+    dialog.tabs.setCurrentIndex(1)  # b, with the same dests as a
+    dialog.widgets[dialog.parser.by_name["n"]].setValue(3)
+    dialog.update_view()
+    results, out_args = dict(dialog.results), list(dialog.out_args)
+    mode = dialog.parser.subparsers["b"].by_name["mode"]
+    jobs = dialog._sweep_jobs(combinations({mode: ["y", "z"]}))
+    assert dialog.results == results
+    assert dialog.out_args == out_args
+    assert dialog.parse_gui() == out_args
+    outputs = [func(*args) for _, _, (func, args) in jobs]
+    assert outputs == ["b n=3 mode=y flag=False", "b n=3 mode=z flag=False"]
+    assert [key[1] for _, key, _ in jobs] == [
+        ("-n", "3", "b", "--mode", "y"),
+        ("-n", "3", "b", "--mode", "z"),
+    ]
+
+
+def test_sweep_dialog(dialog, qapp):
+    dialog.update_view()  # output of n=1, mode=x is cached
+    sweep = dialog.open_sweep()
+    fields = {arg.name: field for arg, field in sweep.fields.items()}
+    assert set(fields) == {"n", "mode", "flag"}
+    fields["n"].setText("1:2")
+    fields["mode"].setText("x, y")
+    sweep.run()
+    assert len(sweep.jobs) == 4
+    assert sweep.nb_cached == 1
+    start = time.perf_counter()
+    while sweep.nb_done < 4 and time.perf_counter() - start < 10:
+        qapp.processEvents()
+    assert [cell.text() for cell in sweep.cells] == [
+        "a n=1 mode=x flag=False",
+        "a n=1 mode=y flag=False",
+        "a n=2 mode=x flag=False",
+        "a n=2 mode=y flag=False",
+    ]
+    fields["n"].setText("1:x")
+    sweep.run()
+    assert "not an integer" in sweep.status.text()
+    sweep.close()
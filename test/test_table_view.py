@@ -0,0 +1,86 @@
+"""Tests of the viewer of tables"""
+
+import pytest
+
+try:
+    from PySide2.QtCore import Qt, QModelIndex
+except ImportError:
+    from PyQt5.QtCore import Qt, QModelIndex
+
+from clitogui import table_view
+from clitogui.table_view import TableModel, TableViewer, is_table, argsort
+
+numpy = pytest.importorskip("numpy")
+
+
+def cells(model: TableModel) -> list:
+    "Return the shown cells of given model, row by row"
+    return [
+        [model.data(model.index(row, column)) for column in range(model.columnCount())]
+        for row in range(model.rowCount())
+    ]
+
+
+def test_is_table():
+    assert is_table([{"a": 1}, {"b": 2}])
+    assert not is_table([{"a": 1}, "not a dict"])
+    assert not is_table([])
+    assert not is_table(({"a": 1},))  # tuples are shown in tabs
+    assert is_table(numpy.zeros(3, dtype=[("x", int), ("y", float)]))
+    assert not is_table(numpy.zeros(3))
+
+
+@pytest.mark.parametrize("table", [(), [], numpy.zeros(0, dtype=[("x", int)])])
+def test_empty_tables(qapp, table):
+    viewer = TableViewer(table=table)
+    assert viewer.model().rowCount() == 0
+    viewer.sortByColumn(0, Qt.AscendingOrder)
+
+
+def test_records(qapp):
+    model = TableModel([{"a": 1, "b": "x"}, {"c": None, "a": 2}])
+    assert [model.headerData(column, Qt.Horizontal) for column in range(3)] == [
+        "a",
+        "b",
+        "c",
+    ]
+    assert cells(model) == [["1", "x", ""], ["2", "", ""]]
+
+
+def test_sort_and_restore(qapp):
+    model = TableModel(
+        numpy.array([(3, "c"), (1, "a"), (2, "b")], dtype=[("n", int), ("s", "U1")])
+    )
+    model.sort(0, Qt.AscendingOrder)
+    assert [row[1] for row in cells(model)] == ["a", "b", "c"]
+    assert model.headerData(0, Qt.Vertical) == "1"  # rows keep their label
+    model.sort(1, Qt.DescendingOrder)
+    assert [row[1] for row in cells(model)] == ["c", "b", "a"]
+    model.sort(-1)
+    assert [row[1] for row in cells(model)] == ["c", "a", "b"]
+
+
+def test_argsort_of_any_values():
+    assert list(argsort([3, None, "a", 1])) == [3, 0, 2, 1]
+    # incomparable values of the same type
+    assert list(argsort([{"b": 1}, {"a": 2}, None])) == [1, 0, 2]
+    assert list(argsort([2j, 1j])) == [1, 0]
+
+
+def test_rows_are_fetched_by_batches(qapp, monkeypatch):
+    monkeypatch.setattr(table_view, "FETCH_BATCH", 10)
+    model = TableModel([{"n": index} for index in range(25)])
+    assert model.rowCount() == 10
+    while model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+    assert model.rowCount() == 25
+
+
+def test_dataframe(qapp):
+    pandas = pytest.importorskip("pandas")
+    frame = pandas.DataFrame({"x": [2, 1], "y": ["b", "a"]}, index=["first", "second"])
+    assert is_table(frame)
+    model = TableModel(frame)
+    model.sort(0)
+    assert cells(model) == [["1", "a"], ["2", "b"]]
+    assert model.headerData(0, Qt.Vertical) == "second"
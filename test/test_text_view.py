@@ -0,0 +1,90 @@
+"""Tests of the viewer of long texts, and of the streaming of lines"""
+
+import time
+import argparse
+
+import pytest
+from PIL import Image
+
+from clitogui import text_view
+from clitogui.text_view import TextViewer
+from clitogui.image_viewer import ImageViewer
+from clitogui.argument_extractor import ExtractedParser
+from clitogui.interactive_gui import (
+    InteractiveInterface,
+    OutputView,
+    LONG_TEXT_LENGTH,
+    lines_text,
+)
+
+
+def wait_loaded(qapp, viewer: TextViewer):
+    while viewer.loading():
+        qapp.processEvents()
+
+
+def test_text_is_loaded_by_chunks(qapp, monkeypatch):
+    monkeypatch.setattr(text_view, "APPEND_CHUNK", 100)
+    text = "".join("line {}\n".format(index) for index in range(1000))
+    viewer = TextViewer(text)
+    assert viewer.loading()
+    assert viewer.toPlainText() == ""  # nothing is laid out synchronously
+    qapp.processEvents()
+    assert 0 < len(viewer.toPlainText()) < len(text)
+    viewer.append_text("end")
+    wait_loaded(qapp, viewer)
+    assert viewer.toPlainText() == text + "end"
+    viewer.set_text("other")
+    wait_loaded(qapp, viewer)
+    assert viewer.toPlainText() == "other"
+
+
+def test_long_texts_are_shown_in_a_text_viewer(qapp):
+    view = OutputView(tabulate=False, tab_names=[])
+    view.show_values("x" * (LONG_TEXT_LENGTH + 1))
+    assert isinstance(view.entries[0][2][0], TextViewer)
+    view.show_values("short")
+    assert view.entries[0][2][0].text() == "short"
+
+
+def test_lines_text():
+    assert lines_text(["a\n", "b", 3]) == "a\nb\n3"
+    assert lines_text("a single line") == "a single line"
+    assert lines_text(None) is None
+    assert lines_text(42) == 42
+
+
+def lines(args):
+    for index in range(args.n):
+        yield "line {}\n".format(index)
+
+
+def run_streamed(qapp, callback, n: int = 0) -> InteractiveInterface:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=n)
+    parser.old_parse_args = parser.parse_args
+    dialog = InteractiveInterface(ExtractedParser(parser), callback, stream="lines")
+    dialog.update_view()
+    start = time.perf_counter()
+    while dialog.runner.running and time.perf_counter() - start < 10:
+        qapp.processEvents()
+    return dialog
+
+
+def test_streamed_lines_are_appended(qapp):
+    dialog = run_streamed(qapp, lines, 500)
+    viewer = dialog.output_view.entries[0][2][0]
+    assert isinstance(viewer, TextViewer)
+    wait_loaded(qapp, viewer)
+    assert viewer.toPlainText() == lines_text(lines(argparse.Namespace(n=500)))
+    dialog.runner.shutdown()
+
+
+def test_lines_mode_with_other_outputs(qapp):
+    dialog = run_streamed(qapp, lambda args: "not a generator")
+    assert dialog.output_view.entries[0][2][0].text() == "not a generator"
+    dialog.runner.shutdown()
+    image = Image.new("RGB", (4, 3))
+    dialog = run_streamed(qapp, lambda args: image)
+    assert isinstance(dialog.output_view.entries[0][2][0], ImageViewer)
+    dialog.runner.shutdown()